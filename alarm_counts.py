@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+# ---------------- Alarm Count Aggregation ----------------
+# Zone x Site x Type counts in a single pass over integer codes, shared by the
+# summary tables and the Telegram notifications.
+
+ALARM_TYPES = ['Motion', 'Vibration']
+COUNT_COLUMNS = [f"{alarm_type} Count" for alarm_type in ALARM_TYPES]
+SUMMARY_COLUMNS = ['Zone', 'Site Alias '] + COUNT_COLUMNS
+
+
+def _codes(column):
+    """Integer codes (-1 for missing) and their labels for a categorical or plain column"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories
+    codes, labels = pd.factorize(column, sort=True)
+    return codes, labels
+
+
+def empty_summary():
+    return pd.DataFrame({
+        'Zone': pd.Series(dtype=object),
+        'Site Alias ': pd.Series(dtype=object),
+        **{col: pd.Series(dtype=int) for col in COUNT_COLUMNS},
+    })
+
+
+# Function to count alarms per Zone, Site Alias and Type in one pass
+def count_alarms(merged_df, start_time_filter=None):
+    """Return one row per (Zone, Site Alias) with its Motion and Vibration counts.
+
+    Rows are ordered by zone then site, as a groupby over both would order them.
+    """
+    zone_codes, zones = _codes(merged_df['Zone'])
+    site_codes, sites = _codes(merged_df['Site Alias '])
+    type_codes = pd.Categorical(merged_df['Type'], categories=ALARM_TYPES).codes
+
+    valid = (zone_codes >= 0) & (site_codes >= 0) & (type_codes >= 0)
+    if start_time_filter is not None:
+        valid &= (merged_df['Start Time'] >= start_time_filter).to_numpy()
+    if not valid.any():
+        return empty_summary()
+
+    zone_codes, site_codes, type_codes = zone_codes[valid], site_codes[valid], type_codes[valid]
+
+    # Dense ids for the (zone, site) pairs that occur, then one bincount over pair x type
+    pair_keys = zone_codes.astype(np.int64) * len(sites) + site_codes
+    pair_ids, pair_keys_seen = pd.factorize(pair_keys, sort=True)
+    counts = np.bincount(pair_ids * len(ALARM_TYPES) + type_codes,
+                         minlength=len(pair_keys_seen) * len(ALARM_TYPES)).reshape(-1, len(ALARM_TYPES))
+
+    summary = pd.DataFrame({
+        'Zone': np.asarray(zones)[pair_keys_seen // len(sites)],
+        'Site Alias ': np.asarray(sites)[pair_keys_seen % len(sites)],
+    })
+    for i, col in enumerate(COUNT_COLUMNS):
+        summary[col] = counts[:, i].astype(int)
+    return summary
+
+
+# Function to split a count summary into per-zone site tables
+def split_by_zone(summary_df):
+    """Map each zone to its sites, busiest first, with a 'Total Alarm Count' column.
+
+    One sort over the whole summary replaces a filter-and-sort per zone.
+    """
+    if summary_df.empty:
+        return {}
+    summary_df = summary_df.assign(**{'Total Alarm Count': summary_df[COUNT_COLUMNS].sum(axis=1)})
+    zone_codes, zones = pd.factorize(summary_df['Zone'].astype(object))
+    order = np.lexsort((-summary_df['Total Alarm Count'].to_numpy(), zone_codes))
+    ordered = summary_df.iloc[order].reset_index(drop=True)
+    bounds = np.flatnonzero(np.diff(zone_codes[order])) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(ordered)]))
+    return {zones[zone_codes[order][start]]: ordered.iloc[start:end] for start, end in zip(starts, ends)}
+
+
+# Function to total the alarm counts of each zone
+def zone_totals(zone_tables):
+    return {zone: {col: int(table[col].sum()) for col in COUNT_COLUMNS} for zone, table in zone_tables.items()}
+
+
+class AlarmTimeIndex:
+    """Answers count_alarms(merged_df, cutoff) for any cutoff without rescanning the rows.
+
+    Built once per loaded report: rows are sorted by Start Time, and for every
+    (zone, site, type) group the time ranks of its rows are stored contiguously and
+    in order. A cutoff is then one binary search for its rank plus one vectorised
+    search per group, O(groups * log n) however large the export is.
+    """
+
+    def __init__(self, merged_df):
+        zone_codes, zones = _codes(merged_df['Zone'])
+        site_codes, sites = _codes(merged_df['Site Alias '])
+        type_codes = pd.Categorical(merged_df['Type'], categories=ALARM_TYPES).codes
+        valid = (zone_codes >= 0) & (site_codes >= 0) & (type_codes >= 0)
+
+        # NaT sorts first as the smallest int64, so any real cutoff excludes it
+        times = merged_df['Start Time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)[valid]
+        pair_keys = zone_codes[valid].astype(np.int64) * len(sites) + site_codes[valid]
+        pair_ids, pair_keys_seen = pd.factorize(pair_keys, sort=True)
+        groups = pair_ids * len(ALARM_TYPES) + type_codes[valid]
+
+        order = np.argsort(times, kind='stable')
+        self.sorted_times = times[order]
+        n = len(order)
+        ranks = np.empty(n, dtype=np.int64)
+        ranks[order] = np.arange(n)
+
+        # Group-major keys: all ranks of group 0, then group 1, ... each ascending
+        self.n_rows = n
+        self.n_groups = len(pair_keys_seen) * len(ALARM_TYPES)
+        self.group_keys = np.sort(groups.astype(np.int64) * n + ranks)
+        self.group_ends = np.searchsorted(self.group_keys, (np.arange(self.n_groups) + 1) * n)
+        self.group_bases = np.arange(self.n_groups, dtype=np.int64) * n
+
+        self.pair_zones = np.asarray(zones)[pair_keys_seen // len(sites)] if n else np.array([], dtype=object)
+        self.pair_sites = np.asarray(sites)[pair_keys_seen % len(sites)] if n else np.array([], dtype=object)
+
+    def counts_since(self, start_time_filter=None):
+        """Same result as count_alarms(merged_df, start_time_filter)"""
+        if self.n_rows == 0:
+            return empty_summary()
+        cutoff_rank = 0
+        if start_time_filter is not None:
+            cutoff_rank = np.searchsorted(self.sorted_times, pd.Timestamp(start_time_filter).value, side='left')
+        firsts = np.searchsorted(self.group_keys, self.group_bases + cutoff_rank, side='left')
+        counts = (self.group_ends - firsts).reshape(-1, len(ALARM_TYPES))
+
+        present = counts.sum(axis=1) > 0
+        if not present.any():
+            return empty_summary()
+        summary = pd.DataFrame({'Zone': self.pair_zones[present], 'Site Alias ': self.pair_sites[present]})
+        for i, col in enumerate(COUNT_COLUMNS):
+            summary[col] = counts[present, i].astype(int)
+        return summary
@@ -0,0 +1,252 @@
+import numpy as np
+import pandas as pd
+
+from alarm_counts import ALARM_TYPES
+
+# ---------------- Per-Site Alarm Rollups ----------------
+# Alarm counts and durations per site in fixed-width time buckets, kept as compact
+# arrays and updated with each new report, so rolling rates and burst flags never
+# rescan the alarm history.
+
+BUCKET_MINUTES = 5
+# Rolling windows the rates are reported over, in minutes
+RATE_WINDOWS = [5, 15, 60]
+# Window a burst is judged on
+BURST_WINDOW = 15
+# Buckets kept per site: a day of baseline plus the longest rate window
+RETAIN_HOURS = 25
+# A site bursts when its rate is this many times its baseline rate...
+BURST_FACTOR = 3.0
+# ...with at least this many alarms in the burst window
+MIN_BURST_ALARMS = 5
+# Baseline rate (alarms per hour) assumed for sites that were quiet all along
+BASELINE_FLOOR = 1.0
+# History needed before a baseline is trusted
+MIN_BASELINE_HOURS = 1
+
+RATE_COLUMNS = [f"{window} min rate" for window in RATE_WINDOWS]
+ROLLUP_COLUMNS = ['Zone', 'Site Alias '] + RATE_COLUMNS + [
+    'Baseline rate', 'Burst Ratio', 'Avg Duration (min)', 'Open Alarms', 'Burst']
+
+_NAT = np.iinfo(np.int64).min
+# Alarm keys hold the Start Time in whole seconds in their upper 32 bits, unsigned, so
+# alarms from 1970 up to early 2106 fit; later or earlier ones are left out
+_KEY_SHIFT = np.uint64(32)
+_MAX_KEY_START = 2 ** 32 * 10 ** 9
+
+
+def empty_rollup():
+    return pd.DataFrame({col: pd.Series(dtype=object if col in ('Zone', 'Site Alias ') else float)
+                         for col in ROLLUP_COLUMNS}).astype({'Open Alarms': int, 'Burst': bool})
+
+
+# Function to reduce alarms to the compact arrays AlarmRollup.add_alarm_arrays takes
+def alarm_arrays(df):
+    """(zone labels, site labels, zone codes, site codes, type codes, Start Time ns,
+    End Time ns) of the alarms of `df` that have a zone, site, type and Start Time.
+
+    A few bytes per alarm, so worker processes can send them instead of DataFrames.
+    """
+    zone_codes, zone_labels = pd.factorize(df['Zone'])
+    site_codes, site_labels = pd.factorize(df['Site Alias '])
+    type_codes = pd.Categorical(df['Type'], categories=ALARM_TYPES).codes
+    starts = df['Start Time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    ends = df['End Time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    valid = (zone_codes >= 0) & (site_codes >= 0) & (type_codes >= 0) & (starts >= 0) & (starts < _MAX_KEY_START)
+    return (np.asarray(zone_labels, dtype=object), np.asarray(site_labels, dtype=object),
+            zone_codes[valid].astype(np.int32), site_codes[valid].astype(np.int32), type_codes[valid].astype(np.int8),
+            starts[valid], ends[valid])
+
+
+# Function to join the alarm_arrays of several batches into one, with one set of labels
+def concat_alarm_arrays(parts):
+    parts = list(parts)
+    if not parts:
+        return alarm_arrays(pd.DataFrame(columns=['Type', 'Zone', 'Site Alias ', 'Start Time', 'End Time']))
+    zone_labels = pd.unique(np.concatenate([part[0] for part in parts]))
+    site_labels = pd.unique(np.concatenate([part[1] for part in parts]))
+    zone_index, site_index = pd.Index(zone_labels), pd.Index(site_labels)
+    return (np.asarray(zone_labels, dtype=object), np.asarray(site_labels, dtype=object),
+            np.concatenate([zone_index.get_indexer(part[0])[part[2]] for part in parts]).astype(np.int32),
+            np.concatenate([site_index.get_indexer(part[1])[part[3]] for part in parts]).astype(np.int32),
+            np.concatenate([part[4] for part in parts]), np.concatenate([part[5] for part in parts]),
+            np.concatenate([part[6] for part in parts]))
+
+
+class AlarmRollup:
+    """Per-site alarm history in BUCKET_MINUTES buckets over the last RETAIN_HOURS.
+
+    Every (Zone, Site Alias) is one row of fixed-width arrays: alarm counts per type,
+    summed alarm durations and the number of alarms with a duration. The window
+    slides forward as newer alarms arrive. `update` only adds alarms it hasn't seen
+    (keyed by type, site and Start Time to the second), so the same day's report can
+    be fed again every cycle. An alarm still open when first seen gets its duration
+    once a later report has its End Time.
+    """
+
+    def __init__(self, bucket_minutes=BUCKET_MINUTES, retain_hours=RETAIN_HOURS):
+        self.bucket_minutes = bucket_minutes
+        self.bucket_seconds = bucket_minutes * 60
+        self.n_buckets = retain_hours * 60 // bucket_minutes
+        self.first_bucket = None
+        self.history_start = None
+        self.latest = None
+
+        self.zones = []
+        self.sites = []
+        self._rows = {}
+        self.counts = np.zeros((0, self.n_buckets, len(ALARM_TYPES)), dtype=np.int32)
+        self.duration_sum = np.zeros((0, self.n_buckets))
+        self.duration_n = np.zeros((0, self.n_buckets), dtype=np.int32)
+
+        # Sorted uint64 keys (Start Time second << 32 | row * types + type) of the alarms held
+        self._seen = np.array([], dtype=np.uint64)
+        self._open = np.array([], dtype=np.uint64)
+
+    def _row(self, zone, site):
+        row = self._rows.get((zone, site))
+        if row is None:
+            row = self._rows[(zone, site)] = len(self.zones)
+            self.zones.append(zone)
+            self.sites.append(site)
+        return row
+
+    def _grow(self):
+        extra = len(self.zones) - len(self.counts)
+        if extra > 0:
+            self.counts = np.concatenate([self.counts, np.zeros((extra,) + self.counts.shape[1:], dtype=np.int32)])
+            self.duration_sum = np.concatenate([self.duration_sum, np.zeros((extra, self.n_buckets))])
+            self.duration_n = np.concatenate([self.duration_n, np.zeros((extra, self.n_buckets), dtype=np.int32)])
+
+    def _advance(self, last_bucket):
+        """Slide the window so that `last_bucket` is its newest bucket, if it isn't covered yet"""
+        if self.first_bucket is None:
+            self.first_bucket = last_bucket - self.n_buckets + 1
+            return
+        shift = last_bucket - (self.first_bucket + self.n_buckets - 1)
+        if shift <= 0:
+            return
+        for array in (self.counts, self.duration_sum, self.duration_n):
+            if shift < self.n_buckets:
+                array[:, :-shift] = array[:, shift:]
+            array[:, -min(shift, self.n_buckets):] = 0
+        self.first_bucket += shift
+
+        # Alarms that slid out of the window are forgotten along with their buckets
+        first_second = self.first_bucket * self.bucket_seconds
+        first_second = np.uint64(max(first_second, 0))
+        self._seen = self._seen[(self._seen >> _KEY_SHIFT) >= first_second]
+        self._open = self._open[(self._open >> _KEY_SHIFT) >= first_second]
+
+    def update(self, df):
+        """Add the alarms of `df` not seen before; returns how many were added.
+
+        `df` needs 'Type', 'Zone', 'Site Alias ', 'Start Time' and 'End Time', e.g. a
+        merged report or one batch of a streamed report.
+        """
+        return self.add_alarm_arrays(alarm_arrays(df))
+
+    def add_alarm_arrays(self, arrays):
+        """`update` for the output of alarm_arrays"""
+        zone_labels, site_labels, zone_codes, site_codes, type_codes, starts, ends = arrays
+        if not len(starts):
+            return 0
+        type_codes = type_codes.astype(np.int64)
+
+        # Rows are looked up once per distinct (zone, site) of the batch
+        pair_keys = zone_codes.astype(np.int64) * len(site_labels) + site_codes
+        pair_ids, pair_keys_seen = pd.factorize(pair_keys)
+        pair_rows = np.array([self._row(zone_labels[key // len(site_labels)], site_labels[key % len(site_labels)])
+                              for key in pair_keys_seen], dtype=np.int64)
+        self._grow()
+
+        seconds = starts // 10 ** 9
+        codes = (pair_rows[pair_ids] * len(ALARM_TYPES) + type_codes).astype(np.uint64)
+        keys, first = np.unique((seconds.astype(np.uint64) << _KEY_SHIFT) | codes, return_index=True)
+        rows, type_codes, starts, ends, seconds = (pair_rows[pair_ids][first], type_codes[first], starts[first],
+                                                   ends[first], seconds[first])
+        buckets = seconds // self.bucket_seconds
+
+        is_new = ~np.isin(keys, self._seen, assume_unique=True)
+        if is_new.any():
+            self._advance(int(buckets[is_new].max()))
+        added = is_new & (buckets >= self.first_bucket)
+        # An alarm seen while still open only adds its duration, once it has closed
+        closed = ends != _NAT
+        closing = ~is_new & closed & np.isin(keys, self._open, assume_unique=True)
+        columns = buckets - self.first_bucket
+
+        np.add.at(self.counts, (rows[added], columns[added], type_codes[added]), 1)
+        timed = (added | closing) & closed & (ends >= starts)
+        np.add.at(self.duration_sum, (rows[timed], columns[timed]), (ends[timed] - starts[timed]) / 1e9)
+        np.add.at(self.duration_n, (rows[timed], columns[timed]), 1)
+
+        self._seen = np.union1d(self._seen, keys[added])
+        self._open = np.union1d(np.setdiff1d(self._open, keys[closing], assume_unique=True), keys[added & ~closed])
+        if added.any():
+            newest = pd.Timestamp(starts[added].max())
+            self.latest = newest if self.latest is None else max(self.latest, newest)
+            oldest = int(buckets[added].min())
+            self.history_start = oldest if self.history_start is None else min(self.history_start, oldest)
+        return int(added.sum())
+
+    def _window_sum(self, array, last_column, n_columns):
+        """Sum of the `n_columns` buckets ending with `last_column`, per site"""
+        low, high = max(last_column - n_columns + 1, 0), min(last_column + 1, self.n_buckets)
+        if high <= low:
+            return np.zeros((len(array),) + array.shape[2:])
+        return array[:, low:high].sum(axis=1)
+
+    def site_rates(self, now=None):
+        """Rolling alarm rates (alarms per hour) of every site with recent activity.
+
+        Windows are whole buckets ending with the one that holds `now` (default: the
+        latest alarm seen). 'Baseline rate' is the site's own rate over the retained
+        history before the longest window; a site bursts when its BURST_WINDOW rate is
+        BURST_FACTOR times that. Durations are averaged over the longest window.
+        """
+        if self.history_start is None:
+            return empty_rollup()
+        now = self.latest if now is None else pd.Timestamp(now)
+        last_column = now.value // 10 ** 9 // self.bucket_seconds - self.first_bucket
+        totals = self.counts.sum(axis=2)
+
+        rollup = pd.DataFrame({'Zone': np.asarray(self.zones, dtype=object),
+                               'Site Alias ': np.asarray(self.sites, dtype=object)})
+        window_counts = {}
+        for window, col in zip(RATE_WINDOWS, RATE_COLUMNS):
+            n_columns = max(1, window // self.bucket_minutes)
+            window_counts[window] = self._window_sum(totals, last_column, n_columns)
+            rollup[col] = window_counts[window] * 60 / (n_columns * self.bucket_minutes)
+
+        recent_columns = max(1, max(RATE_WINDOWS) // self.bucket_minutes)
+        baseline_last = last_column - recent_columns
+        baseline_first = max(self.history_start - self.first_bucket, 0)
+        baseline_columns = baseline_last - baseline_first + 1
+        baseline_hours = baseline_columns * self.bucket_minutes / 60
+        if baseline_hours >= MIN_BASELINE_HOURS:
+            rollup['Baseline rate'] = self._window_sum(totals, baseline_last, baseline_columns) / baseline_hours
+        else:
+            rollup['Baseline rate'] = np.nan
+
+        burst_rate = rollup[RATE_COLUMNS[RATE_WINDOWS.index(BURST_WINDOW)]]
+        rollup['Burst Ratio'] = burst_rate / rollup['Baseline rate'].clip(lower=BASELINE_FLOOR)
+        durations = self._window_sum(self.duration_sum, last_column, recent_columns)
+        timed = self._window_sum(self.duration_n, last_column, recent_columns)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rollup['Avg Duration (min)'] = np.where(timed > 0, durations / timed / 60, np.nan)
+        rows = (self._open & np.uint64(0xFFFFFFFF)).astype(np.int64) // len(ALARM_TYPES)
+        rollup['Open Alarms'] = np.bincount(rows, minlength=len(self.zones)).astype(int)
+        rollup['Burst'] = ((rollup['Burst Ratio'] >= BURST_FACTOR)
+                           & (window_counts[BURST_WINDOW] >= MIN_BURST_ALARMS)).to_numpy()
+
+        active = (window_counts[max(RATE_WINDOWS)] > 0) | (rollup['Open Alarms'] > 0).to_numpy()
+        burst_col = RATE_COLUMNS[RATE_WINDOWS.index(BURST_WINDOW)]
+        rollup = rollup[active].sort_values([burst_col, 'Zone', 'Site Alias '], ascending=[False, True, True])
+        return rollup.round({col: 1 for col in RATE_COLUMNS + ['Baseline rate', 'Burst Ratio', 'Avg Duration (min)']}
+                            ).reset_index(drop=True)
+
+    def bursts(self, now=None):
+        """Sites bursting at `now`, most unusual first"""
+        rollup = self.site_rates(now)
+        return rollup[rollup['Burst']].sort_values('Burst Ratio', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+# ---------------- Alarm Store ----------------
+# Append-only history of every alarm seen in an export, so repeated pulls of the same
+# day only add the new events and counts come from indexed queries.
+
+ALARM_STORE_PATH = os.environ.get("PULSEFORGE_ALARM_STORE", "alarm_store.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alarms (
+    type TEXT NOT NULL,
+    zone TEXT,
+    site TEXT NOT NULL,
+    start_time INTEGER NOT NULL,  -- nanoseconds since the epoch, as in datetime64[ns]
+    end_time INTEGER,
+    PRIMARY KEY (type, site, start_time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_alarms_start ON alarms (start_time, zone, site, type);
+CREATE TABLE IF NOT EXISTS watermarks (
+    type TEXT PRIMARY KEY,
+    start_time INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingested_reports (
+    report_key TEXT PRIMARY KEY,
+    rows_added INTEGER NOT NULL
+);
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _to_ns(value):
+    return pd.Timestamp(value).value
+
+
+def _ns_list(times):
+    """datetime64 column as a list of integer nanoseconds, with None for NaT"""
+    ns = times.to_numpy(dtype='datetime64[ns]').astype('int64').tolist()
+    return [None if missing else value for value, missing in zip(ns, times.isna().tolist())]
+
+
+class AlarmStore:
+    """SQLite store of alarms keyed by (Type, Site Alias, Start Time)"""
+
+    def __init__(self, path=ALARM_STORE_PATH):
+        self.path = path
+        # Streamlit serves every session from its own thread, so one connection is shared under a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def insert_report(self, df, report_key=None):
+        """Add the alarms of a merged report, skipping ones already stored.
+
+        `df` needs 'Type', 'Zone', 'Site Alias ', 'Start Time' and 'End Time'. When a
+        `report_key` (e.g. the workbook content hash) was ingested before, nothing is
+        read at all. Returns the number of new alarms.
+        """
+        with self._lock:
+            if report_key is not None and self._conn.execute(
+                    "SELECT 1 FROM ingested_reports WHERE report_key = ?", (report_key,)).fetchone():
+                return 0
+
+            df = df.dropna(subset=['Site Alias ', 'Start Time'])
+            rows = zip(
+                df['Type'].astype(str),
+                df['Zone'].astype(object).where(df['Zone'].notna(), None),
+                df['Site Alias '].astype(str),
+                _ns_list(df['Start Time']),
+                _ns_list(df['End Time']),
+            )
+
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO alarms (type, zone, site, start_time, end_time) VALUES (?, ?, ?, ?, ?)", rows)
+                added = self._conn.total_changes - before
+
+                latest = df.groupby(df['Type'].astype(str))['Start Time'].max()
+                self._conn.executemany(
+                    "INSERT INTO watermarks (type, start_time) VALUES (?, ?) "
+                    "ON CONFLICT (type) DO UPDATE SET start_time = MAX(start_time, excluded.start_time)",
+                    [(alarm_type, _to_ns(ts)) for alarm_type, ts in latest.items()])
+                if report_key is not None:
+                    self._conn.execute("INSERT INTO ingested_reports (report_key, rows_added) VALUES (?, ?)",
+                                       (report_key, added))
+            return added
+
+    def high_water_mark(self, alarm_type):
+        """Latest Start Time stored for an alarm type, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT start_time FROM watermarks WHERE type = ?", (alarm_type,)).fetchone()
+        return pd.Timestamp(row[0]) if row else None
+
+    def count_since(self, start_time_filter=None, zones=None):
+        """Motion/Vibration counts per Zone and Site Alias, shaped like count_entries_by_zone"""
+        query = ("SELECT zone, site, SUM(type = 'Motion'), SUM(type = 'Vibration') FROM alarms "
+                 "WHERE start_time >= ?")
+        params = [_to_ns(start_time_filter) if start_time_filter is not None else -2 ** 63]
+        if zones is not None:
+            zones = [str(zone) for zone in zones]
+            query += f" AND zone IN ({', '.join('?' * len(zones))})"
+            params += zones
+        query += " GROUP BY zone, site HAVING SUM(type IN ('Motion', 'Vibration')) > 0"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return pd.DataFrame(rows, columns=['Zone', 'Site Alias ', 'Motion Count', 'Vibration Count']).astype(
+            {'Motion Count': int, 'Vibration Count': int})
+
+    def version(self):
+        """Changes whenever a new report is ingested; usable as a cache key for derived data"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ingested_reports").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Function to get the process-wide store for a path, shared across Streamlit reruns
+def open_alarm_store(path=ALARM_STORE_PATH):
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = AlarmStore(path)
+        return _stores[path]
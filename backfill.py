@@ -0,0 +1,286 @@
+"""Backfill a date range of RMS alarm reports into a partitioned local Parquet dataset.
+
+The range is split into chunks of --chunk-days days, each exported as one Motion and
+one Vibration report. Chunks download concurrently on a bounded pool. Every
+finished chunk is recorded in a checkpoint, so rerunning the same command after a
+crash only fetches what is missing:
+
+    python backfill.py --from 2024-01-01 --to 2024-01-31
+    python backfill.py --from 2024-01-01 --to 2024-01-31 --chunk-days 3 --workers 4
+
+Reports are streamed batch by batch into `<dataset>/type=<Type>/date=<YYYY-MM-DD>/`
+(one file per type and day, replaced whenever that day is exported again, however
+the range is chunked), never merged in memory; read_backfill loads a slice.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import requests
+
+from progress import log_progress
+from pulse_pipeline import (DEFAULT_ENGINE, ENGINES, REPORT_TYPES, close_browser_sessions, download_reports,
+                            find_report_zip)
+from rms_http import RmsExportError, RmsHttpClient
+from xlsx_stream import iter_report_batches
+
+# ---------------- Backfill Dataset ----------------
+BACKFILL_DIR = os.environ.get("PULSEFORGE_BACKFILL_DIR", "backfill_data")
+CHECKPOINT_FILE = "_checkpoint.json"
+# Days per export; one chunk is one Motion and one Vibration report
+CHUNK_DAYS = 7
+# Chunks downloading at once; browser chunks also share the warm session pool
+MAX_CHUNK_WORKERS = 3
+# Partition for alarms without a readable Start Time
+UNKNOWN_DATE = "unknown"
+# File holding all of a type's alarms of one day
+DAY_FILE = "part-0.parquet"
+
+PARTITION_SCHEMA = pa.schema([
+    ("Zone", pa.string()),
+    ("Site Alias ", pa.string()),
+    ("Start Time", pa.timestamp("ns")),
+    ("End Time", pa.timestamp("ns")),
+])
+PARTITIONING = ds.partitioning(pa.schema([("type", pa.string()), ("date", pa.string())]), flavor="hive")
+
+
+# Function to split an inclusive date range into export-sized chunks
+def date_chunks(start_date, end_date, chunk_days=CHUNK_DAYS):
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def chunk_id(chunk):
+    return f"{chunk[0]:%Y%m%d}-{chunk[1]:%Y%m%d}"
+
+
+# Function to list the partition dates an inclusive chunk covers
+def chunk_dates(chunk):
+    return [f"{chunk[0] + timedelta(days=i):%Y-%m-%d}" for i in range((chunk[1] - chunk[0]).days + 1)]
+
+
+class BackfillCheckpoint:
+    """Finished (type, day) partitions of a dataset, kept in `<dataset>/_checkpoint.json`.
+
+    Keyed by day rather than by chunk, so a rerun with another --chunk-days or an
+    overlapping range still skips what is done. The file is rewritten atomically
+    after every chunk, so it only ever lists days whose partition files are complete.
+    """
+
+    def __init__(self, dataset_dir):
+        self.path = os.path.join(dataset_dir, CHECKPOINT_FILE)
+        self._lock = threading.Lock()
+        self.days = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                # Checkpoints of the older per-chunk layout have no "days"; those chunks are redone
+                self.days = json.load(f).get("days", {})
+
+    def is_done(self, chunk, report_types=REPORT_TYPES):
+        with self._lock:
+            return all(f"{report_type}/{day}" in self.days for report_type in report_types for day in chunk_dates(chunk))
+
+    def mark_done(self, chunk, rows):
+        """`rows` is {type: {day: alarms}} as written by write_report_partitions"""
+        finished_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            for report_type, day_rows in rows.items():
+                for day in chunk_dates(chunk):
+                    self.days[f"{report_type}/{day}"] = {"rows": day_rows.get(day, 0), "chunk": chunk_id(chunk),
+                                                         "finished_at": finished_at}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"days": self.days}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+# Function to stream one downloaded report into the dataset's day partitions
+def write_report_partitions(report_file, dataset_dir, report_type, part_name, dates=()):
+    """Returns {day: alarms written}.
+
+    Each day's alarms go to its DAY_FILE, written under a temporary name and moved into
+    place when the whole report has been read, so exporting a day again replaces its
+    file instead of adding a second one. Days of `dates` without any alarm lose their
+    old file. Alarms without a Start Time can't be keyed by day and go to
+    `date=unknown/part-<part_name>.parquet`.
+    """
+    writers = {}
+    rows = {}
+    try:
+        for batch in iter_report_batches(report_file):
+            if batch.empty:
+                continue
+            frame = pd.DataFrame({
+                "Zone": batch["Zone"].astype(object).where(batch["Zone"].notna(), None),
+                "Site Alias ": batch["Site Alias "].astype(object).where(batch["Site Alias "].notna(), None),
+                "Start Time": batch["Start Time"],
+                "End Time": batch["End Time"],
+            })
+            days = batch["Start Time"].dt.normalize()
+            for day, part in frame.groupby(days, dropna=False, sort=False):
+                label = UNKNOWN_DATE if pd.isna(day) else f"{day:%Y-%m-%d}"
+                if label not in writers:
+                    partition_dir = os.path.join(dataset_dir, f"type={report_type}", f"date={label}")
+                    os.makedirs(partition_dir, exist_ok=True)
+                    path = os.path.join(partition_dir, f"part-{part_name}.parquet" if label == UNKNOWN_DATE else DAY_FILE)
+                    # Concurrent chunks may both hold alarms of a day; each writes its own temporary file
+                    writers[label] = (pq.ParquetWriter(f"{path}.{part_name}.tmp", PARTITION_SCHEMA), path)
+                writers[label][0].write_table(pa.Table.from_pandas(part, schema=PARTITION_SCHEMA, preserve_index=False))
+                rows[label] = rows.get(label, 0) + len(part)
+    except BaseException:
+        for writer, path in writers.values():
+            writer.close()
+            os.remove(f"{path}.{part_name}.tmp")
+        raise
+
+    for label, (writer, path) in writers.items():
+        writer.close()
+        os.replace(f"{path}.{part_name}.tmp", path)
+        if label != UNKNOWN_DATE:
+            remove_stale_parts(os.path.dirname(path), keep=DAY_FILE)
+    for label in set(dates) - set(writers):
+        remove_stale_parts(os.path.join(dataset_dir, f"type={report_type}", f"date={label}"))
+    return rows
+
+
+# Function to remove a day partition's Parquet files other than `keep`, e.g. per-chunk files of the older layout
+def remove_stale_parts(partition_dir, keep=None):
+    if not os.path.isdir(partition_dir):
+        return
+    for name in os.listdir(partition_dir):
+        if name.endswith(".parquet") and name != keep:
+            os.remove(os.path.join(partition_dir, name))
+
+
+# Function to load a slice of the backfilled dataset, shaped like merge_report_files output
+def read_backfill(dataset_dir=BACKFILL_DIR, start_date=None, end_date=None, report_types=None):
+    dataset = ds.dataset(dataset_dir, format="parquet", partitioning=PARTITIONING)
+    condition = None
+    for expression in [
+        ds.field("date") >= f"{start_date:%Y-%m-%d}" if start_date is not None else None,
+        ds.field("date") <= f"{end_date:%Y-%m-%d}" if end_date is not None else None,
+        ds.field("type").isin(list(report_types)) if report_types is not None else None,
+    ]:
+        if expression is not None:
+            condition = expression if condition is None else condition & expression
+    df = dataset.to_table(filter=condition).to_pandas()
+    df = df.drop(columns="date").rename(columns={"type": "Type"})
+    for col in ["Zone", "Site Alias ", "Type"]:
+        df[col] = df[col].astype("category")
+    return df
+
+
+# ---------------- Backfill Runner ----------------
+# Function to download one chunk and stream its reports into the dataset
+def backfill_chunk(chunk, username, password, dataset_dir, engine=DEFAULT_ENGINE, client=None, log=log_progress):
+    download_path = tempfile.mkdtemp(prefix=f"pulseforge_backfill_{chunk_id(chunk)}_")
+    try:
+        if not download_reports(username, password, chunk[0], download_path, engine=engine, client=client, log=log,
+                                end_date=chunk[1]):
+            return None
+        rows = {}
+        for report_type in REPORT_TYPES:
+            report_file = find_report_zip(download_path, report_type)
+            if report_file is None:
+                return None
+            rows[report_type] = write_report_partitions(report_file, dataset_dir, report_type, chunk_id(chunk),
+                                                        dates=chunk_dates(chunk))
+        return rows
+    finally:
+        # Only the partitions are kept; the downloaded ZIPs go as soon as they are read
+        shutil.rmtree(download_path, ignore_errors=True)
+
+
+def run_backfill(username, password, start_date, end_date, dataset_dir=BACKFILL_DIR, chunk_days=CHUNK_DAYS,
+                 workers=MAX_CHUNK_WORKERS, engine=DEFAULT_ENGINE, log=log_progress):
+    """Backfill [start_date, end_date]; returns the ids of the chunks that failed.
+
+    Chunks whose days are all in the checkpoint are skipped. HTTP exports share one logged-in
+    client, browser exports the warm session pool.
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    checkpoint = BackfillCheckpoint(dataset_dir)
+    chunks = date_chunks(start_date, end_date, chunk_days)
+    pending = [chunk for chunk in chunks if not checkpoint.is_done(chunk)]
+    log(f"Backfill {start_date} to {end_date}: {len(chunks)} chunks, {len(chunks) - len(pending)} already done")
+
+    client = None
+    if engine in ("auto", "http"):
+        client = RmsHttpClient(pool_size=max(1, workers * len(REPORT_TYPES)))
+        try:
+            # Log in once up front rather than in every concurrent chunk
+            client.login(username, password)
+        except (requests.RequestException, RmsExportError) as e:
+            log(f"⚠️ RMS API login failed: {e}", "warning")
+
+    failed = []
+
+    def run_chunk(chunk):
+        try:
+            rows = backfill_chunk(chunk, username, password, dataset_dir, engine=engine, client=client, log=log)
+        except Exception as e:
+            log(f"❌ Chunk {chunk_id(chunk)} failed: {e}", "error")
+            rows = None
+        if rows is None:
+            failed.append(chunk_id(chunk))
+            return
+        checkpoint.mark_done(chunk, rows)
+        log(f"✅ Chunk {chunk_id(chunk)} done: " + ", ".join(f"{t} {sum(n.values())}" for t, n in rows.items()),
+            "success")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(run_chunk, pending))
+    finally:
+        if client is not None:
+            client.close()
+    return sorted(failed)
+
+
+def main(argv=None):
+    parse_date = lambda value: datetime.strptime(value, "%Y-%m-%d").date()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="start_date", type=parse_date, required=True, metavar="YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_date", type=parse_date, required=True, metavar="YYYY-MM-DD")
+    parser.add_argument("--username", default=os.environ.get("RMS_USERNAME", "akib"))
+    parser.add_argument("--password", default=os.environ.get("RMS_PASSWORD"))
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE)
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS)
+    parser.add_argument("--workers", type=int, default=MAX_CHUNK_WORKERS)
+    parser.add_argument("--dataset", default=BACKFILL_DIR)
+    args = parser.parse_args(argv)
+
+    if args.password is None:
+        parser.error("an RMS password is required (--password or RMS_PASSWORD)")
+    if args.end_date < args.start_date or args.chunk_days < 1:
+        parser.error("--to must not be before --from, and --chunk-days must be at least 1")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        failed = run_backfill(args.username, args.password, args.start_date, args.end_date, dataset_dir=args.dataset,
+                              chunk_days=args.chunk_days, workers=args.workers, engine=args.engine)
+    finally:
+        close_browser_sessions()
+    if failed:
+        log_progress(f"{len(failed)} chunks failed ({', '.join(failed)}); rerun the same command to retry them.", "error")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark the single-pass alarm aggregation against the previous groupby/merge path,
+and start-time filter changes against a prebuilt AlarmTimeIndex.
+
+Usage:
+    python benchmarks/bench_aggregation.py --rows 1000000
+
+Both paths compute the summary table plus the per-zone site tables that the page and
+the notification buttons consume, and the results are checked to be the same.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alarm_counts import AlarmTimeIndex, count_alarms, split_by_zone, zone_totals  # noqa: E402
+
+
+# Function to build an in-memory merged report like merge_report_files returns
+def synthetic_merged_df(rows, zones=40, sites_per_zone=150, seed=0):
+    rng = np.random.default_rng(seed)
+    zone_ids = rng.integers(0, zones, rows)
+    site_ids = rng.integers(0, sites_per_zone, rows)
+    start = np.datetime64("2024-01-01T00:00:00") + rng.integers(0, 86400, rows).astype("timedelta64[s]")
+    return pd.DataFrame({
+        "Zone": pd.Categorical.from_codes(zone_ids, [f"Zone{i:02d}" for i in range(zones)]),
+        "Site Alias ": pd.Categorical([f"Z{z:02d}S{s:03d}" for z, s in zip(zone_ids, site_ids)]),
+        "Start Time": start.astype("datetime64[ns]"),
+        "Type": pd.Categorical.from_codes(rng.integers(0, 2, rows), ["Motion", "Vibration"]),
+    })
+
+
+# The count_entries_by_zone implementation this engine replaced
+def legacy_count_entries_by_zone(merged_df, start_time_filter=None):
+    if start_time_filter is not None:
+        merged_df = merged_df[merged_df['Start Time'] >= start_time_filter]
+    motion_count = merged_df[merged_df['Type'] == 'Motion'].groupby(['Zone', 'Site Alias '], observed=True).size().reset_index(name='Motion Count')
+    vibration_count = merged_df[merged_df['Type'] == 'Vibration'].groupby(['Zone', 'Site Alias '], observed=True).size().reset_index(name='Vibration Count')
+    final_df = pd.merge(motion_count, vibration_count, on=['Zone', 'Site Alias '], how='outer').fillna({'Motion Count': 0, 'Vibration Count': 0})
+    final_df['Motion Count'] = final_df['Motion Count'].astype(int)
+    final_df['Vibration Count'] = final_df['Vibration Count'].astype(int)
+    return final_df
+
+
+def legacy_page(merged_df, start_time_filter):
+    """Summary, then a filter-and-count per zone (notifications) and a filter-and-sort per zone (tables)"""
+    summary_df = legacy_count_entries_by_zone(merged_df, start_time_filter)
+    tables = {}
+    for zone in merged_df['Zone'].unique():
+        zone_df = merged_df[(merged_df['Zone'] == zone) & (merged_df['Start Time'] >= start_time_filter)]
+        if not zone_df.empty:
+            site_summary = legacy_count_entries_by_zone(zone_df, start_time_filter)
+            site_summary['Total Alarm Count'] = site_summary['Motion Count'] + site_summary['Vibration Count']
+            site_summary.sort_values(by='Total Alarm Count', ascending=False)
+    for zone in summary_df['Zone'].unique():
+        zone_df = summary_df[summary_df['Zone'] == zone].copy()
+        zone_df['Total Alarm Count'] = zone_df['Motion Count'] + zone_df['Vibration Count']
+        tables[zone] = zone_df.sort_values('Total Alarm Count', ascending=False)
+    return summary_df, tables
+
+
+def engine_page(merged_df, start_time_filter):
+    summary_df = count_alarms(merged_df, start_time_filter)
+    tables = split_by_zone(summary_df)
+    zone_totals(tables)
+    return summary_df, tables
+
+
+def best_of(fn, repeat, *args):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    merged_df = synthetic_merged_df(args.rows)
+    start_time_filter = pd.Timestamp("2024-01-01 06:00")
+
+    legacy_seconds, (legacy_summary, legacy_tables) = best_of(legacy_page, args.repeat, merged_df, start_time_filter)
+    engine_seconds, (engine_summary, engine_tables) = best_of(engine_page, args.repeat, merged_df, start_time_filter)
+
+    # Same counts, same zones, same site sets per zone
+    key = ['Zone', 'Site Alias ']
+    pd.testing.assert_frame_equal(
+        legacy_summary.astype({'Zone': object, 'Site Alias ': object}).sort_values(key).reset_index(drop=True),
+        engine_summary.sort_values(key).reset_index(drop=True), check_dtype=False)
+    assert set(map(str, legacy_tables)) == set(map(str, engine_tables))
+
+    print(f"rows: {args.rows}, zone/site pairs: {len(engine_summary)}")
+    print(f"legacy groupby/merge + per-zone filtering: {legacy_seconds:.3f} s")
+    print(f"single-pass engine:                        {engine_seconds:.3f} s  ({legacy_seconds / engine_seconds:.1f}x)")
+
+    # Moving the start-time filter against a prebuilt time index
+    build_seconds, time_index = best_of(AlarmTimeIndex, 1, merged_df)
+    cutoffs = pd.date_range("2024-01-01", periods=24, freq="h")
+    started = time.perf_counter()
+    for cutoff in cutoffs:
+        time_index.counts_since(cutoff)
+    query_seconds = (time.perf_counter() - started) / len(cutoffs)
+    pd.testing.assert_frame_equal(time_index.counts_since(start_time_filter), engine_summary)
+    print(f"time index: built once in {build_seconds:.3f} s, then {query_seconds * 1000:.2f} ms per filter change")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark multi-process alarm counting over a partitioned dataset against loading
+everything into one process and counting there.
+
+Usage:
+    python benchmarks/bench_parallel_counts.py --rows 4000000 --days 8
+
+A synthetic dataset shaped like backfill.py output (type=<Type>/date=<day>/ Parquet
+files) is written to a temporary directory first. Counting is timed with one
+worker up to --max-workers (default: every core), and every result is checked
+against the single-process count.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alarm_counts import count_alarms  # noqa: E402
+from backfill import PARTITION_SCHEMA, read_backfill  # noqa: E402
+from bench_aggregation import synthetic_merged_df  # noqa: E402
+from parallel_counts import count_dataset, dataset_partitions, get_executor  # noqa: E402
+
+
+# Function to write a synthetic backfill dataset of `rows` alarms spread over `days` days
+def write_dataset(dataset_dir, rows, days, row_group_rows):
+    per_day = rows // days
+    for day in range(days):
+        df = synthetic_merged_df(per_day, seed=day)
+        df["Start Time"] = df["Start Time"] + pd.Timedelta(days=day)
+        df["End Time"] = df["Start Time"] + pd.Timedelta(minutes=5)
+        label = f"{df['Start Time'].iloc[0]:%Y-%m-%d}"
+        for alarm_type, part in df.groupby("Type", observed=True):
+            partition_dir = os.path.join(dataset_dir, f"type={alarm_type}", f"date={label}")
+            os.makedirs(partition_dir, exist_ok=True)
+            table = pa.Table.from_pandas(
+                part[["Zone", "Site Alias ", "Start Time", "End Time"]].astype({"Zone": object, "Site Alias ": object}),
+                schema=PARTITION_SCHEMA, preserve_index=False)
+            pq.write_table(table, os.path.join(partition_dir, "part-bench.parquet"), row_group_size=row_group_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=4000000)
+    parser.add_argument("--days", type=int, default=8)
+    parser.add_argument("--row-group-rows", type=int, default=250000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    dataset_dir = tempfile.mkdtemp(prefix="pulseforge_bench_")
+    try:
+        write_dataset(dataset_dir, args.rows, args.days, args.row_group_rows)
+        start_time_filter = pd.Timestamp("2024-01-01 06:00")
+        print(f"rows: {args.rows}, partitions (row groups): {len(dataset_partitions(dataset_dir))}, "
+              f"cores: {os.cpu_count()}")
+
+        started = time.perf_counter()
+        expected = count_alarms(read_backfill(dataset_dir), start_time_filter)
+        baseline = time.perf_counter() - started
+        print(f"load all + count_alarms, one process: {baseline:.2f} s")
+
+        workers = 1
+        while workers <= args.max_workers:
+            if workers > 1:
+                get_executor(workers).submit(int).result()  # worker startup is not part of a count
+            started = time.perf_counter()
+            result = count_dataset(dataset_dir, start_time_filter=start_time_filter, max_workers=workers)
+            seconds = time.perf_counter() - started
+            pd.testing.assert_frame_equal(result, expected.reset_index(drop=True), check_dtype=False)
+            print(f"count_dataset, {workers} worker(s):     {seconds:.2f} s  ({baseline / seconds:.1f}x)")
+            workers *= 2
+    finally:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure how long the Streamlit app takes to start and to rerun.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --rows 10000 --repeat 5
+
+Each sample is a fresh interpreter running pulseForge.py through Streamlit's AppTest:
+
+    cold start   the first script run, including every module the script imports
+    rerun        the next run of the same session, as after a widget change
+
+Two pages are measured: the landing page (nothing downloaded or uploaded yet) and
+the report page, with synthetic reports from bench_suite.report_zips. The heavy
+modules the process ended up importing are listed, so a dependency that should
+only load on the automation path shows up here.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import DATA_DIR, report_zips  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["selenium", "webdriver_manager", "openpyxl", "pyarrow.parquet"]
+
+SAMPLE_SCRIPT = """
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file("pulseForge.py", default_timeout=300)
+if sys.argv[1]:
+    at.session_state["reports_downloaded"] = True
+    at.session_state["motion_file_path"] = sys.argv[1]
+    at.session_state["vibration_file_path"] = sys.argv[2]
+started = time.perf_counter()
+at.run()
+cold = time.perf_counter() - started
+started = time.perf_counter()
+at.run()
+rerun = time.perf_counter() - started
+print(json.dumps({"cold": cold, "rerun": rerun, "errors": [str(e.value) for e in at.exception],
+                  "loaded": [name for name in json.loads(sys.argv[3]) if name in sys.modules]}))
+"""
+
+
+# Function to run one fresh-process sample of a page
+def sample(motion_zip="", vibration_zip=""):
+    output = subprocess.run([sys.executable, "-c", SAMPLE_SCRIPT, motion_zip, vibration_zip, json.dumps(HEAVY_MODULES)],
+                            cwd=REPO_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="rows per synthetic report on the report page")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    pages = {"landing page": ("", ""), f"report page ({args.rows} rows)": report_zips(args.rows, args.data_dir)}
+    for page, files in pages.items():
+        samples = [sample(*files) for _ in range(args.repeat)]
+        errors = [error for s in samples for error in s["errors"]]
+        print(f"{page}:")
+        print(f"  cold start  {statistics.median(s['cold'] for s in samples):.3f} s (median of {args.repeat})")
+        print(f"  rerun       {statistics.median(s['rerun'] for s in samples):.3f} s")
+        print(f"  loaded      {', '.join(samples[0]['loaded']) or '-'}")
+        if errors:
+            print(f"  errors      {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""Benchmark and profile the PulseForge data path stage by stage, from 1k to 5M rows.
+
+Usage:
+    python benchmarks/bench_suite.py                              # 1k, 10k, 100k rows
+    python benchmarks/bench_suite.py --rows 1000 1000000 5000000 --output results.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json
+    python benchmarks/bench_suite.py --rows 100000 --profile cprofile --profile-stage merge_report_files
+
+Synthetic Motion and Vibration reports are written the way RMS delivers them: an
+.xlsx inside a .zip, two banner rows above the header, and a 'Site Alias ' column
+with its trailing space. They are kept in --data-dir, so each size is generated once.
+
+Every size runs in a fresh subprocess (so peak RSS is its own) through the stages:
+
+    load                  both workbooks through report_cache.read_report_workbook
+    preprocess_report     both reports
+    merge_report_files    including its own preprocessing
+    count_entries_by_zone for a 06:00 start-time filter
+    split_by_zone         per-zone site tables plus zone totals
+    time_index            sort by Start Time and build an AlarmTimeIndex
+    alarm_rollup          AlarmRollup.update with the merged report, then its bursts
+    render_styled_table   every zone table
+    build_zone_messages   the Telegram alert of every zone
+
+--memory adds the peak traced allocation of each stage (tracemalloc; slower, so
+those timings are not comparable). --output writes the results as JSON; a saved
+file passed to --compare flags every stage that got slower than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from memory_usage import format_mb, peak_rss_mb  # noqa: E402
+
+DEFAULT_ROWS = [1000, 10000, 100000]
+DATA_DIR = os.path.join(tempfile.gettempdir(), "pulseforge_bench_data")
+STAGES = ["load", "preprocess_report", "merge_report_files", "count_entries_by_zone", "split_by_zone",
+          "time_index", "alarm_rollup", "render_styled_table", "build_zone_messages"]
+# Stages faster than this in the baseline are too noisy to flag as regressions, in seconds
+MIN_COMPARED_SECONDS = 0.01
+GENERATE_BATCH_ROWS = 100000
+
+ZONES = ["Sylhet", "Gazipur", "Shariatpur", "Narayanganj", "Faridpur", "Mymensingh", "Banani", "Mirpur",
+         "Rangpur", "Rajshahi", "Khulna", "Barishal", "Comilla", "Bogura", "Dinajpur", "Jessore"]
+SITES_PER_ZONE = 150
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Alarm Report" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+    '</Relationships>'
+)
+HEADER = ["SL", "Zone", "Site Alias ", "Alarm Name", "Start Time", "End Time", "Duration"]
+
+
+def _inline(text):
+    return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+# Function to write an RMS-shaped report ZIP of `rows` alarms without going through openpyxl
+def write_report_zip(path, alarm_type, rows, seed=0):
+    """Zone, site and alarm name are shared strings, times inline strings as in the
+    RMS export; alarms start over one day from 2024-01-01."""
+    rng = np.random.default_rng(seed)
+    sites = [f"{zone[:3].upper()}{i:03d}" for zone in ZONES for i in range(1, SITES_PER_ZONE + 1)]
+    shared = ["Alarm Report", HEADER[1], HEADER[2], HEADER[3], alarm_type] + ZONES + sites
+    zone_base, site_base = 5, 5 + len(ZONES)
+
+    xlsx_path = path + ".xlsx"
+    with zipfile.ZipFile(xlsx_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES)
+        zf.writestr("_rels/.rels", ROOT_RELS)
+        zf.writestr("xl/workbook.xml", WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        zf.writestr("xl/sharedStrings.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{len(shared)}" uniqueCount="{len(shared)}">'
+            + "".join(f"<si><t>{text}</t></si>" for text in shared) + "</sst>"))
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as f:
+            f.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                     '<row r="1"><c t="s"><v>0</v></c></row>'
+                     f'<row r="2">{_inline("Generated: 01-01-2024")}</row>'
+                     '<row r="3">' + _inline(HEADER[0]) + '<c t="s"><v>1</v></c><c t="s"><v>2</v></c><c t="s"><v>3</v></c>'
+                     + "".join(_inline(name) for name in HEADER[4:]) + "</row>").encode())
+            for first in range(0, rows, GENERATE_BATCH_ROWS):
+                n = min(GENERATE_BATCH_ROWS, rows - first)
+                zone_ids = rng.integers(0, len(ZONES), n)
+                site_ids = zone_ids * SITES_PER_ZONE + rng.integers(0, SITES_PER_ZONE, n)
+                start = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 86400, n), unit="s")
+                minutes = rng.integers(1, 90, n)
+                end = start + pd.to_timedelta(minutes, unit="m")
+                start_text = start.strftime("%Y-%m-%d %H:%M:%S")
+                end_text = end.strftime("%Y-%m-%d %H:%M:%S")
+                f.write("".join(
+                    f'<row r="{first + i + 4}"><c><v>{first + i + 1}</v></c><c t="s"><v>{zone_base + z}</v></c>'
+                    f'<c t="s"><v>{site_base + s}</v></c><c t="s"><v>4</v></c>'
+                    f'{_inline(st)}{_inline(et)}{_inline(f"0:{m:02d}:00" if m < 60 else f"1:{m - 60:02d}:00")}</row>'
+                    for i, (z, s, st, et, m) in enumerate(zip(zone_ids.tolist(), site_ids.tolist(), start_text,
+                                                             end_text, minutes.tolist()))).encode())
+            f.write(b"</sheetData></worksheet>")
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(xlsx_path, f"{alarm_type.lower()}_report.xlsx")
+    os.remove(xlsx_path)
+
+
+# Function to get the cached Motion/Vibration report ZIPs of a size, generating them once
+def report_zips(rows, data_dir=DATA_DIR):
+    os.makedirs(data_dir, exist_ok=True)
+    paths = []
+    for seed, alarm_type in enumerate(["Motion", "Vibration"]):
+        path = os.path.join(data_dir, f"{alarm_type.lower()}_{rows}.zip")
+        if not os.path.exists(path):
+            print(f"Writing synthetic {alarm_type} report with {rows} rows...", file=sys.stderr)
+            write_report_zip(path + ".tmp", alarm_type, rows, seed=seed)
+            os.replace(path + ".tmp", path)
+        paths.append(path)
+    return paths
+
+
+class StageRunner:
+    """Times each stage (best of `repeat`), optionally tracing memory or profiling it"""
+
+    def __init__(self, rows, repeat=1, memory=False, profiler=None, profile_stages=None, profile_dir="."):
+        self.rows = rows
+        self.repeat = repeat
+        self.memory = memory
+        self.profiler = profiler
+        self.profile_stages = profile_stages
+        self.profile_dir = profile_dir
+        self.results = []
+
+    def _profiled(self, name, fn):
+        if self.profiler is None or (self.profile_stages and name not in self.profile_stages):
+            return fn()
+        base = os.path.join(self.profile_dir, f"profile_{self.rows}_{name}")
+        if self.profiler == "cprofile":
+            import cProfile
+            import pstats
+
+            profile = cProfile.Profile()
+            result = profile.runcall(fn)
+            profile.dump_stats(base + ".prof")
+            pstats.Stats(profile, stream=sys.stderr).sort_stats("cumulative").print_stats(15)
+        else:
+            from pyinstrument import Profiler
+
+            profile = Profiler()
+            profile.start()
+            try:
+                result = fn()
+            finally:
+                profile.stop()
+            with open(base + ".txt", "w") as f:
+                f.write(profile.output_text())
+            print(profile.output_text(), file=sys.stderr)
+        return result
+
+    def run(self, name, fn):
+        seconds = []
+        peak_mb = None
+        for attempt in range(self.repeat):
+            if self.memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            result = self._profiled(name, fn) if attempt == 0 else fn()
+            seconds.append(time.perf_counter() - started)
+            if self.memory:
+                peak_mb = max(peak_mb or 0, tracemalloc.get_traced_memory()[1] / 2 ** 20)
+                tracemalloc.stop()
+        record = {"rows": self.rows, "stage": name, "seconds": round(min(seconds), 4)}
+        if peak_mb is not None:
+            record["traced_peak_mb"] = round(peak_mb, 1)
+        self.results.append(record)
+        return result
+
+
+# Function run inside the child process: every stage for one report size
+def run_stages(rows, motion_zip, vibration_zip, runner):
+    from alarm_counts import AlarmTimeIndex, split_by_zone, zone_totals
+    from alarm_rollups import AlarmRollup
+    from pulse_pipeline import build_zone_messages, count_entries_by_zone, merge_report_files, preprocess_report
+    from report_cache import read_report_workbook
+    from table_render import render_styled_table
+
+    motion_df, vibration_df = runner.run(
+        "load", lambda: (read_report_workbook(motion_zip), read_report_workbook(vibration_zip)))
+    runner.run("preprocess_report", lambda: (preprocess_report(motion_df.copy(), "Motion"),
+                                             preprocess_report(vibration_df.copy(), "Vibration")))
+    merged_df = runner.run("merge_report_files", lambda: merge_report_files(motion_df.copy(), vibration_df.copy()))
+
+    start_time_filter = pd.Timestamp("2024-01-01 06:00")
+    summary_df = runner.run("count_entries_by_zone", lambda: count_entries_by_zone(merged_df, start_time_filter))
+    zone_tables = runner.run("split_by_zone", lambda: split_by_zone(summary_df))
+    zone_totals(zone_tables)
+    runner.run("time_index", lambda: AlarmTimeIndex(merged_df.sort_values('Start Time', kind='stable', ignore_index=True)))
+
+    def rollup_bursts():
+        rollup = AlarmRollup()
+        rollup.update(merged_df)
+        return rollup.bursts()
+    runner.run("alarm_rollup", rollup_bursts)
+
+    columns = ['Site Alias ', 'Motion Count', 'Vibration Count']
+    runner.run("render_styled_table", lambda: [render_styled_table(table[columns]) for table in zone_tables.values()])
+    roster = pd.DataFrame({"Zone": ZONES, "Name": [f"concern_{i}" for i in range(len(ZONES))]})
+    runner.run("build_zone_messages",
+               lambda: build_zone_messages(list(zone_tables), zone_tables, start_time_filter.to_pydatetime(), roster))
+    return len(merged_df)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# Function to list the stages of `results` that got slower than in `baseline`
+def regressions(results, baseline, threshold):
+    previous = {(r["rows"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    found = []
+    for r in results:
+        before = previous.get((r["rows"], r["stage"]))
+        if before is not None and before >= MIN_COMPARED_SECONDS and r["seconds"] > before * (1 + threshold):
+            found.append({**r, "baseline_seconds": before, "ratio": round(r["seconds"] / before, 2)})
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="alarms per report type")
+    parser.add_argument("--repeat", type=int, default=1, help="best of N per stage")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where the synthetic reports are kept")
+    parser.add_argument("--memory", action="store_true", help="trace the peak allocation of every stage")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"])
+    parser.add_argument("--profile-stage", nargs="+", choices=STAGES, help="stages to profile (default: all)")
+    parser.add_argument("--profile-dir", default=".")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown that counts as a regression")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # Child process: one size, results as one JSON line on stdout
+        rows = args.rows[0]
+        runner = StageRunner(rows, args.repeat, args.memory, args.profile, args.profile_stage, args.profile_dir)
+        started = time.perf_counter()
+        merged_rows = run_stages(rows, *report_zips(rows, args.data_dir), runner)
+        print(json.dumps({
+            "rows": rows,
+            "merged_rows": merged_rows,
+            "total_seconds": round(time.perf_counter() - started, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": runner.results,
+        }))
+        return
+
+    if args.profile == "pyinstrument":
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            parser.error("--profile pyinstrument needs pyinstrument installed (pip install pyinstrument)")
+
+    sizes = []
+    for rows in args.rows:
+        report_zips(rows, args.data_dir)
+        command = [sys.executable, __file__, "--run", "--rows", str(rows), "--repeat", str(args.repeat),
+                   "--data-dir", args.data_dir, "--profile-dir", args.profile_dir]
+        if args.memory:
+            command.append("--memory")
+        if args.profile:
+            command += ["--profile", args.profile]
+        if args.profile_stage:
+            command += ["--profile-stage"] + args.profile_stage
+        out = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True)
+        size = json.loads(out.stdout.strip().splitlines()[-1])
+        sizes.append(size)
+
+        print(f"\n{rows} rows per type ({size['merged_rows']} merged): {size['total_seconds']} s, "
+              f"peak RSS {format_mb(size['peak_rss_mb'])} MB")
+        for stage in size["stages"]:
+            memory = f"{stage['traced_peak_mb']:>10} MB" if "traced_peak_mb" in stage else ""
+            print(f"  {stage['stage']:<24}{stage['seconds']:>10.4f} s{memory}")
+
+    report = {
+        "environment": environment(),
+        "sizes": [{key: value for key, value in size.items() if key != "stages"} for size in sizes],
+        "results": [stage for size in sizes for stage in size["stages"]],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(report["results"], json.load(f), args.threshold)
+        for r in found:
+            print(f"REGRESSION {r['rows']} rows {r['stage']}: {r['baseline_seconds']} s -> {r['seconds']} s "
+                  f"({r['ratio']}x)")
+        if found:
+            raise SystemExit(1)
+        print(f"\nNo stage more than {args.threshold:.0%} slower than {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
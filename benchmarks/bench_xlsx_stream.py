@@ -0,0 +1,82 @@
+"""Compare peak RSS and wall time of pd.read_excel against the streaming XLSX reader.
+
+Usage:
+    python benchmarks/bench_xlsx_stream.py --rows 200000
+
+Each reader runs in a fresh subprocess so peak RSS is not shared between them. The
+synthetic report is bench_suite's Motion report of that size (see report_zips).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import DATA_DIR, report_zips  # noqa: E402
+from memory_usage import current_rss_mb, format_mb, peak_rss_mb  # noqa: E402
+
+
+# Function run inside the child process: parse the ZIP with one reader and report stats
+def run_reader(reader, zip_path):
+    import pandas as pd
+
+    from report_cache import compact_report
+    from xlsx_stream import iter_report_batches
+
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    if reader == "read_excel":
+        # The previous path: extract the workbook to disk, then parse it with openpyxl
+        with tempfile.TemporaryDirectory() as tmp, zipfile.ZipFile(zip_path) as zf:
+            xlsx_path = zf.extract(zf.namelist()[0], tmp)
+            df = pd.read_excel(xlsx_path, header=2)
+            df['Start Time'] = pd.to_datetime(df['Start Time'], errors='coerce')
+            df['End Time'] = pd.to_datetime(df['End Time'], errors='coerce')
+    else:
+        df = compact_report(pd.concat(iter_report_batches(zip_path), ignore_index=True))
+    elapsed = time.perf_counter() - started
+
+    # Either figure is None where the platform can't report it (Windows without psutil)
+    peak = peak_rss_mb()
+    print(json.dumps({
+        "reader": reader,
+        "rows": len(df),
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": peak,
+        "peak_rss_delta_mb": round(peak - rss_before, 1) if peak is not None and rss_before is not None else None,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the synthetic report")
+    parser.add_argument("--zip", help="benchmark an existing RMS ZIP instead of a synthetic one")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where the synthetic reports are kept")
+    parser.add_argument("--run", choices=["read_excel", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_reader(args.run, args.zip)
+        return
+
+    zip_path = args.zip if args.zip is not None else report_zips(args.rows, args.data_dir)[0]
+    results = []
+    for reader in ("read_excel", "stream"):
+        out = subprocess.run([sys.executable, __file__, "--run", reader, "--zip", zip_path],
+                             check=True, capture_output=True, text=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'reader':<12}{'rows':>10}{'seconds':>10}{'peak RSS MB':>14}{'delta MB':>11}")
+    for r in results:
+        print(f"{r['reader']:<12}{r['rows']:>10}{r['seconds']:>10}{format_mb(r['peak_rss_mb']):>14}"
+              f"{format_mb(r['peak_rss_delta_mb']):>11}")
+
+
+if __name__ == "__main__":
+    main()
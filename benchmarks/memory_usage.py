@@ -0,0 +1,48 @@
+"""Process memory figures for the benchmarks, on Linux, macOS and Windows.
+
+psutil is used when it is installed. Without it, Linux and macOS fall back to the
+`resource` module (and /proc for the current RSS); Windows then reports None and the
+benchmarks print "n/a" instead of an RSS figure.
+"""
+import sys
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Function to get the current resident set size in MB, or None where it can't be read
+def current_rss_mb():
+    if psutil is not None:
+        return round(psutil.Process().memory_info().rss / 2 ** 20, 1)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+# Function to get this process's peak resident set size in MB, or None where it can't be read
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return round(peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024, 1)
+    if psutil is not None:
+        # Windows keeps the peak as the process's peak working set
+        peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+        return round(peak / 2 ** 20, 1) if peak is not None else None
+    return None
+
+
+def format_mb(value):
+    return "n/a" if value is None else value
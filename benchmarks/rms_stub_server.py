@@ -0,0 +1,142 @@
+"""Local stand-in for the RMS export API that rms_http.RmsHttpClient talks to.
+
+Usage:
+    python benchmarks/rms_stub_server.py --port 8765 --rows 10000
+    RMS_HTTP_ENABLED=1 RMS_BASE_URL=http://127.0.0.1:8765 python pulse_pipeline.py --engine http --once --dry-run
+
+It serves the placeholder endpoints from rms_http (login, export job, status polling,
+ZIP download) with synthetic reports from bench_suite.report_zips, so the HTTP engine
+can be exercised and timed without the real RMS. Any username is accepted with
+--password; a token stops working after --token-ttl seconds, which exercises the
+pipeline's re-login retry.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import DATA_DIR, report_zips  # noqa: E402
+from rms_http import EXPORT_DOWNLOAD_PATH, EXPORT_PATH, EXPORT_STATUS_PATH, LOGIN_PATH  # noqa: E402
+
+
+def _path_pattern(template):
+    return re.compile("^" + re.escape(template).replace(re.escape("{job_id}"), r"(\w+)") + "$")
+
+
+STATUS_PATTERN = _path_pattern(EXPORT_STATUS_PATH)
+DOWNLOAD_PATTERN = _path_pattern(EXPORT_DOWNLOAD_PATH)
+
+
+class StubState:
+    """Tokens, export jobs and the report ZIPs served for them"""
+
+    def __init__(self, password, report_files, polls, token_ttl):
+        self.password = password
+        self.report_files = report_files
+        self.polls = polls
+        self.token_ttl = token_ttl
+        self.tokens = {}
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"{self.command} {self.path} -> {args[1] if len(args) > 1 else ''}\n")
+
+    def _send_json(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        with self.state.lock:
+            issued = self.state.tokens.get(token)
+        return issued is not None and time.monotonic() - issued < self.state.token_ttl
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path == LOGIN_PATH:
+            if body.get("password") != self.state.password:
+                return self._send_json({"error": "invalid credentials"}, 401)
+            token = secrets.token_hex(16)
+            with self.state.lock:
+                self.state.tokens[token] = time.monotonic()
+            return self._send_json({"token": token})
+        if self.path != EXPORT_PATH:
+            return self._send_json({"error": "not found"}, 404)
+        if not self._authorized():
+            return self._send_json({"error": "unauthorized"}, 401)
+        report_type = (body.get("alarmTypes") or [None])[0]
+        if report_type not in self.state.report_files:
+            return self._send_json({"error": f"unknown alarm type {report_type}"}, 400)
+        with self.state.lock:
+            job_id = str(next(self.state.job_ids))
+            self.state.jobs[job_id] = {"type": report_type, "polls": 0}
+        self._send_json({"jobId": job_id})
+
+    def do_GET(self):
+        if not self._authorized():
+            return self._send_json({"error": "unauthorized"}, 401)
+        status_match, download_match = STATUS_PATTERN.match(self.path), DOWNLOAD_PATTERN.match(self.path)
+        job = self.state.jobs.get((status_match or download_match).group(1)) if status_match or download_match else None
+        if job is None:
+            return self._send_json({"error": "not found"}, 404)
+        if status_match:
+            job["polls"] += 1
+            return self._send_json({"status": "DONE" if job["polls"] > self.state.polls else "RUNNING"})
+
+        path = self.state.report_files[job["type"]]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f'attachment; filename="{job["type"].lower()}_report.zip"')
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                self.wfile.write(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--password", default=os.environ.get("RMS_PASSWORD", "akib123"))
+    parser.add_argument("--rows", type=int, default=1000, help="alarms per synthetic report")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--polls", type=int, default=2, help="status polls answered RUNNING before DONE")
+    parser.add_argument("--token-ttl", type=float, default=3600, help="seconds a login token stays valid")
+    args = parser.parse_args()
+
+    motion_zip, vibration_zip = report_zips(args.rows, args.data_dir)
+    StubHandler.state = StubState(args.password, {"Motion": motion_zip, "Vibration": vibration_zip}, args.polls,
+                                  args.token_ttl)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"RMS stub listening on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
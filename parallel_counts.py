@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from alarm_counts import ALARM_TYPES, COUNT_COLUMNS, count_alarms, empty_summary
+from alarm_rollups import alarm_arrays, concat_alarm_arrays
+from report_cache import REPORT_COLUMNS, alarm_fingerprint, combine_fingerprints
+from xlsx_stream import iter_report_batches
+
+# ---------------- Multi-Process Alarm Counts ----------------
+# For report sets too large for one process: every worker parses one partition (a
+# report workbook, or one row group of a backfilled Parquet file) and reduces it to
+# per-(Zone, Site) count arrays; only those small partials travel back and are summed.
+# The full event table is never built anywhere. For the per-site rollups,
+# scan_report_files also sends back each report's alarms as compact arrays (see
+# alarm_rollups.alarm_arrays), which the parent adds to its rollup and drops report
+# by report.
+
+COUNT_SOURCE_COLUMNS = ['Zone', 'Site Alias ', 'Start Time']
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+
+# Function to turn a count summary into compact (zones, sites, counts) arrays
+def summary_arrays(summary_df):
+    return (summary_df['Zone'].to_numpy(dtype=object), summary_df['Site Alias '].to_numpy(dtype=object),
+            summary_df[COUNT_COLUMNS].to_numpy(dtype=np.int64).reshape(-1, len(COUNT_COLUMNS)))
+
+
+# Function to sum partial count arrays into one summary, shaped like count_alarms output
+def reduce_counts(partials):
+    partials = [partial for partial in partials if len(partial[0])]
+    if not partials:
+        return empty_summary()
+    zones = np.concatenate([partial[0] for partial in partials])
+    sites = np.concatenate([partial[1] for partial in partials])
+    counts = np.concatenate([partial[2] for partial in partials])
+
+    zone_codes, zone_labels = pd.factorize(zones, sort=True)
+    site_codes, site_labels = pd.factorize(sites, sort=True)
+    pair_ids, pair_keys = pd.factorize(zone_codes.astype(np.int64) * len(site_labels) + site_codes, sort=True)
+
+    summary = pd.DataFrame({
+        'Zone': np.asarray(zone_labels, dtype=object)[pair_keys // len(site_labels)],
+        'Site Alias ': np.asarray(site_labels, dtype=object)[pair_keys % len(site_labels)],
+    })
+    for i, col in enumerate(COUNT_COLUMNS):
+        summary[col] = np.bincount(pair_ids, weights=counts[:, i], minlength=len(pair_keys)).astype(int)
+    return summary
+
+
+def _count_batch(df, alarm_type, start_time_filter):
+    return summary_arrays(count_alarms(df.assign(Type=alarm_type), start_time_filter))
+
+
+# Function run in a worker process: the counts of one partition as compact arrays
+def count_partition(partition):
+    """`partition` is (path, alarm_type, row_group, start_time_filter); a row_group of
+    None means a report workbook/ZIP, which is streamed batch by batch."""
+    path, alarm_type, row_group, start_time_filter = partition
+    if row_group is None:
+        partials = [_count_batch(batch, alarm_type, start_time_filter)
+                    for batch in iter_report_batches(path, usecols=COUNT_SOURCE_COLUMNS)]
+    else:
+        # Dictionary-encoded columns arrive as categoricals, so nothing is factorized twice
+        table = pq.ParquetFile(path, read_dictionary=['Zone', 'Site Alias ']).read_row_group(
+            row_group, columns=COUNT_SOURCE_COLUMNS)
+        partials = [_count_batch(table.to_pandas(), alarm_type, start_time_filter)]
+    return summary_arrays(reduce_counts(partials))
+
+
+# Function run in a worker process: the counts, alarm fingerprint and rollup arrays of one report
+def scan_report(partition):
+    """`partition` is (path, alarm_type, start_time_filter). The report is parsed once
+    for all three; the alarms come back as one alarm_arrays tuple for the report."""
+    path, alarm_type, start_time_filter = partition
+    partials, fingerprints, alarms = [], [], []
+    for batch in iter_report_batches(path, usecols=REPORT_COLUMNS):
+        batch = batch.assign(Type=alarm_type)
+        partials.append(summary_arrays(count_alarms(batch, start_time_filter)))
+        fingerprints.append(alarm_fingerprint(batch))
+        alarms.append(alarm_arrays(batch))
+    return summary_arrays(reduce_counts(partials)), combine_fingerprints(fingerprints), concat_alarm_arrays(alarms)
+
+
+# Function to get the process-wide worker pool, started once and reused
+def get_executor(max_workers=None):
+    """Workers are spawned rather than forked: the app and the pipeline run threads
+    (Streamlit sessions, browser pool) that a forked child must not inherit."""
+    global _executor, _executor_workers
+    max_workers = max_workers or os.cpu_count() or 1
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = max_workers
+        return _executor
+
+
+# Function to count a list of partitions, in parallel when there is more than one
+def count_partitions(partitions, max_workers=None):
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(partitions) <= 1:
+        partials = [count_partition(partition) for partition in partitions]
+    else:
+        # A few partitions per task keeps the per-task overhead down when there are many
+        chunksize = max(1, len(partitions) // (max_workers * 4))
+        partials = list(get_executor(max_workers).map(count_partition, partitions, chunksize=chunksize))
+    return reduce_counts(partials)
+
+
+# Function to count alarms across report workbooks, one worker per file
+def count_report_files(report_files, start_time_filter=None, max_workers=None):
+    """`report_files` is a list of (path, alarm_type), e.g. [(motion_zip, 'Motion'), ...].
+
+    Same result as count_alarms over the merged reports.
+    """
+    partitions = [(path, alarm_type, None, start_time_filter) for path, alarm_type in report_files]
+    return count_partitions(partitions, max_workers)
+
+
+# Function to count and fingerprint the alarms of report workbooks, one worker per file
+def scan_report_files(report_files, start_time_filter=None, max_workers=None, rollup=None):
+    """Like count_report_files, but returns (summary, fingerprint); the fingerprint
+    equals report_cache.alarm_fingerprint of the merged reports. With a `rollup`
+    (alarm_rollups.AlarmRollup), each report's alarms are added to it as its worker
+    finishes."""
+    partitions = [(path, alarm_type, start_time_filter) for path, alarm_type in report_files]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(partitions) <= 1:
+        results = map(scan_report, partitions)
+    else:
+        results = get_executor(max_workers).map(scan_report, partitions)
+    partials, fingerprints = [], []
+    for counts, fingerprint, alarms in results:
+        partials.append(counts)
+        fingerprints.append(fingerprint)
+        if rollup is not None:
+            rollup.add_alarm_arrays(alarms)
+    return reduce_counts(partials), combine_fingerprints(fingerprints)
+
+
+# Function to list the row groups of a backfilled dataset (see backfill.py) as partitions
+def dataset_partitions(dataset_dir, start_date=None, end_date=None, start_time_filter=None):
+    partitions = []
+    for root, _, files in os.walk(dataset_dir):
+        alarm_type = re.search(r"type=([^/\\]+)", root)
+        day = re.search(r"date=([^/\\]+)", root)
+        if alarm_type is None or day is None or alarm_type.group(1) not in ALARM_TYPES:
+            continue
+        if start_date is not None and day.group(1) < f"{start_date:%Y-%m-%d}":
+            continue
+        if end_date is not None and day.group(1) > f"{end_date:%Y-%m-%d}":
+            continue
+        for name in sorted(files):
+            if name.endswith(".parquet"):
+                path = os.path.join(root, name)
+                partitions += [(path, alarm_type.group(1), row_group, start_time_filter)
+                               for row_group in range(pq.ParquetFile(path).num_row_groups)]
+    return partitions
+
+
+# Function to count alarms across a backfilled date range, one worker per row group
+def count_dataset(dataset_dir, start_date=None, end_date=None, start_time_filter=None, max_workers=None):
+    return count_partitions(dataset_partitions(dataset_dir, start_date, end_date, start_time_filter), max_workers)
@@ -0,0 +1,48 @@
+import logging
+import time
+from contextlib import contextmanager
+
+# ---------------- Progress Reporting ----------------
+# The download stages report progress through a `log(message, level)` callable, so the
+# same code writes to the Streamlit page in the app and to the logging module headless.
+
+logger = logging.getLogger("pulseforge")
+
+LOG_LEVELS = {
+    "header": logging.INFO,
+    "info": logging.INFO,
+    "success": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+
+# Function to report progress through the logging module (the default outside the app)
+def log_progress(message, level="info"):
+    logger.log(LOG_LEVELS.get(level, logging.INFO), message)
+
+
+# ---------------- Step Timing ----------------
+class StepTimer:
+    """Records how long each automation step of one report export takes"""
+
+    def __init__(self, report_type):
+        self.report_type = report_type
+        self.records = []
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            self.records.append({
+                "Report": self.report_type,
+                "Step": name,
+                "Seconds": round(time.perf_counter() - started, 2),
+                "Status": status,
+            })
@@ -0,0 +1,465 @@
+"""PulseForge pipeline: download, ingest, aggregate and notify, without the Streamlit UI.
+
+The app (pulseForge.py) calls these stages from its buttons; run this module directly
+to pull the reports and send the zone alerts unattended on a fixed interval:
+
+    python pulse_pipeline.py --username akib --every 15
+    python pulse_pipeline.py --once --dry-run
+
+The RMS password comes from --password or the RMS_PASSWORD environment variable, the
+Telegram bot and group from TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+from alarm_counts import ALARM_TYPES, count_alarms, split_by_zone
+from alarm_rollups import BURST_WINDOW, AlarmRollup
+from progress import StepTimer, log_progress, logger
+from report_cache import alarm_fingerprint, file_content_hash, load_report
+from rms_http import RMS_HTTP_ENABLED, RmsExportError, RmsHttpClient
+from telegram_dispatch import get_dispatcher
+
+# Zone -> concern roster the alerts mention
+USERNAME_FILE = "USER NAME.xlsx"
+
+# Telegram bot and group the zone alerts go to
+TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "NA")
+TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "NA")
+
+# Define zone priority order for display
+zone_priority = ["Sylhet", "Gazipur", "Shariatpur", "Narayanganj", "Faridpur", "Mymensingh"]
+
+# One report per alarm type is downloaded per cycle
+REPORT_TYPES = ALARM_TYPES
+
+# Download engines: "auto" tries the RMS API first and falls back to the browser. Both
+# need RMS_HTTP_ENABLED, as the RMS API calls in rms_http are unverified placeholders
+ENGINES = ["auto", "http", "browser"] if RMS_HTTP_ENABLED else ["browser"]
+# The RMS API calls in rms_http are unverified, so the browser stays the default for now
+DEFAULT_ENGINE = "browser"
+DEFAULT_INTERVAL_MINUTES = 15
+
+
+# ---------------- Zonal Concerns ----------------
+_roster_cache = {}
+_roster_lock = threading.Lock()
+
+
+# Function to load the zone -> concern roster, cached until the file changes
+def load_username_roster(path=USERNAME_FILE):
+    """The workbook is read again only when its modification time or size changes;
+    every caller gets its own copy of the cached roster."""
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _roster_lock:
+        cached = _roster_cache.get(path)
+        if cached is None or cached[0] != version:
+            cached = (version, pd.read_excel(path))
+            _roster_cache[path] = cached
+    return cached[1].copy()
+
+
+# Function to look up the concern of a zone in the roster
+def zonal_concern(username_df, zone):
+    concern = username_df[username_df['Zone'] == zone]['Name'].values
+    return concern[0] if len(concern) > 0 else "Unknown Concern"
+
+
+# Function to update the 'USER NAME.xlsx' file with the new concern name
+def update_username_file(selected_zone, new_concern, path=USERNAME_FILE):
+    """Only the Name cells of the zone are edited in place, so the rest of the workbook
+    (other sheets, formatting, column widths) is kept; nothing is written when the
+    concern is already set. Returns whether the file changed."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path)
+    sheet = workbook.active
+    header = [cell.value for cell in sheet[1]]
+    zone_col, name_col = header.index('Zone') + 1, header.index('Name') + 1
+
+    # Update the concern name for the selected zone
+    changed = False
+    for row in range(2, sheet.max_row + 1):
+        name_cell = sheet.cell(row=row, column=name_col)
+        if sheet.cell(row=row, column=zone_col).value == selected_zone and name_cell.value != new_concern:
+            name_cell.value = new_concern
+            changed = True
+
+    if changed:
+        workbook.save(path)
+        with _roster_lock:
+            _roster_cache.pop(path, None)
+    workbook.close()
+    return changed
+
+
+# ---------------- Ingest and Aggregate ----------------
+# Function to preprocess report files
+def preprocess_report(df, alarm_type):
+    df["Type"] = alarm_type  # Specify type as either 'Motion' or 'Vibration'
+    for col in ['Start Time', 'End Time']:
+        # Parsed reports already hold datetime64; to_datetime would still walk every value
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+# Function to merge motion and vibration data from report files
+def merge_report_files(report_motion_df, report_vibration_df):
+    report_motion_df = preprocess_report(report_motion_df, 'Motion')
+    report_vibration_df = preprocess_report(report_vibration_df, 'Vibration')
+
+    # Merging the two reports
+    merged_df = pd.concat([report_motion_df, report_vibration_df], ignore_index=True)
+
+    # Concatenating categoricals with different categories falls back to object, so re-compact
+    for col in ['Zone', 'Site Alias ', 'Type']:
+        merged_df[col] = merged_df[col].astype('category')
+    return merged_df
+
+
+# Function to load and merge a Motion and a Vibration report (paths or file objects)
+def ingest_reports(report_motion_file, report_vibration_file, report_keys=None):
+    """Parsed reports come from report_cache, keyed by `report_keys` when already hashed"""
+    motion_key, vibration_key = report_keys if report_keys is not None else (None, None)
+    report_motion_df = load_report(report_motion_file, key=motion_key)
+    report_vibration_df = load_report(report_vibration_file, key=vibration_key)
+    return merge_report_files(report_motion_df, report_vibration_df)
+
+
+# Function to count occurrences of Motion and Vibration events per Site Alias and Zone
+def count_entries_by_zone(merged_df, start_time_filter=None, store=None, time_index=None):
+    # With an alarm store, the counts for the zones in merged_df come from its indexed history
+    if store is not None:
+        return store.count_since(start_time_filter, zones=merged_df['Zone'].dropna().unique())
+
+    # A prebuilt AlarmTimeIndex of merged_df answers any cutoff with binary searches
+    if time_index is not None:
+        return time_index.counts_since(start_time_filter)
+
+    # Otherwise one pass over integer codes; see alarm_counts.count_alarms
+    return count_alarms(merged_df, start_time_filter)
+
+
+# ---------------- Notifications ----------------
+# Function to build the Telegram alert for one zone from its site table
+def build_zone_message(zone, site_table, start_time_filter, zonal_concern, burst_table=None, bursts_as_of=None):
+    lines = [
+        "<b>Motion & Vibration Alarm Alert</b>\n",
+        f"<b>{zone}:</b>\nAlarm came after: {start_time_filter.strftime('%Y-%m-%d %I:%M %p')}\n",
+    ]
+    lines += [f"#{site}: Vibration: {vibration}, Motion: {motion} "
+              for site, vibration, motion in zip(site_table['Site Alias '], site_table['Vibration Count'], site_table['Motion Count'])]
+    # Sites of the zone well above their usual alarm rate; see alarm_rollups.AlarmRollup
+    if burst_table is not None and not burst_table.empty:
+        as_of = f" as of {bursts_as_of.strftime('%I:%M %p')}" if bursts_as_of is not None else " now"
+        lines.append(f"\n<b>Bursting{as_of}:</b>")
+        lines += [f"#{site}: {rate:g} alarms/h over the last {BURST_WINDOW} min, usually {baseline:g}/h"
+                  for site, rate, baseline in zip(burst_table['Site Alias '], burst_table[f"{BURST_WINDOW} min rate"],
+                                                  burst_table['Baseline rate'])]
+    lines.append(f"\n@{zonal_concern}, please take care.")
+    return "\n".join(lines)
+
+
+# Function to build the alert of every listed zone that has alarms in the window
+def build_zone_messages(zones, zone_tables, start_time_filter, username_df, bursts=None, bursts_as_of=None):
+    """`bursts` (AlarmRollup.bursts output) adds each zone's bursting sites to its alert;
+    `bursts_as_of` is the time the burst windows end at"""
+    return {zone: build_zone_message(zone, zone_tables[zone], start_time_filter, zonal_concern(username_df, zone),
+                                     None if bursts is None else bursts[bursts['Zone'] == zone], bursts_as_of)
+            for zone in zones if zone in zone_tables}
+
+
+# Function to send zone alerts; returns {zone: DeliveryResult}
+def send_zone_messages(messages, bot_token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID):
+    # Zones go out in the order given (zone_priority first), each with all its parts together
+    return get_dispatcher(bot_token).dispatch(messages, chat_id=chat_id)
+
+
+# ---------------- Downloads ----------------
+# Function to empty the per-type download directories so old exports aren't picked up
+def clear_report_dirs(download_path, report_types=None):
+    for report_type in REPORT_TYPES if report_types is None else report_types:
+        shutil.rmtree(os.path.join(download_path, report_type.lower()), ignore_errors=True)
+
+
+# Function to find the downloaded ZIP for a report type
+def find_report_zip(download_path, report_type):
+    report_dir = os.path.join(download_path, report_type.lower())
+    if not os.path.isdir(report_dir):
+        return None
+    zip_files = [f for f in os.listdir(report_dir) if f.endswith('.zip')]
+    return os.path.join(report_dir, zip_files[0]) if zip_files else None
+
+
+# Function to download the reports through the RMS API, without launching a browser
+def download_reports_http(username, password, specific_date, download_path, report_types=None, timings=None,
+                          client=None, log=log_progress, thread_setup=None, end_date=None):
+    """Export every report type concurrently over one HTTP session.
+
+    A passed `client` is reused (and left open), logging in only if it hasn't yet, so
+    a caller that keeps one client skips the login and TCP/TLS setup on later runs.
+    With an `end_date`, the reports cover `specific_date` through `end_date`.
+    """
+    end_date = specific_date if end_date is None else end_date
+    report_types = REPORT_TYPES if report_types is None else list(report_types)
+    owns_client = client is None
+    if owns_client:
+        client = RmsHttpClient(pool_size=max(1, len(report_types)))
+    login_timer = StepTimer("All")
+    timers = [StepTimer(report_type) for report_type in report_types]
+
+    def export(report_type, timer):
+        if thread_setup is not None:
+            thread_setup()
+        report_dir = os.path.join(download_path, report_type.lower())
+        os.makedirs(report_dir, exist_ok=True)
+        with timer.step("export"):
+            log(f"📤 Requesting {report_type} XLSX export...")
+            job_id = client.start_export(report_type, specific_date, end_date)
+            client.wait_for_export(job_id)
+        with timer.step("download"):
+            zip_path = client.download_export(job_id, report_dir, f"{report_type.lower()}_report.zip")
+        log(f"✅ {report_type} report saved: {os.path.basename(zip_path)}")
+
+    try:
+        if not client.logged_in:
+            with login_timer.step("login"):
+                log("🔐 Logging in to the RMS API...")
+                client.login(username, password)
+        with ThreadPoolExecutor(max_workers=max(1, len(report_types))) as pool:
+            list(pool.map(export, report_types, timers))
+        return True
+    except (requests.RequestException, RmsExportError) as e:
+        log(f"⚠️ Direct HTTP export failed: {e}", "warning")
+        return False
+    finally:
+        if owns_client:
+            client.close()
+        if timings is not None:
+            for timer in [login_timer] + timers:
+                timings.extend(timer.records)
+
+
+# Function to download every report type with an engine from ENGINES
+def download_reports(username, password, specific_date, download_path, engine=DEFAULT_ENGINE, client=None,
+                     log=log_progress, end_date=None):
+    """Download into fresh per-type directories; "auto" falls back from HTTP to the browser.
+
+    A reused, already logged-in `client` whose export fails logs in again and retries
+    once, in case its session expired since it was last used.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown download engine {engine!r}; available: {', '.join(ENGINES)} "
+                         "(\"auto\" and \"http\" need RMS_HTTP_ENABLED=1)")
+    clear_report_dirs(download_path)
+    if engine in ("auto", "http"):
+        reused_login = client is not None and client.logged_in
+        if download_reports_http(username, password, specific_date, download_path, client=client, log=log,
+                                 end_date=end_date):
+            return True
+        clear_report_dirs(download_path)
+        if reused_login:
+            client.logged_in = False
+            if download_reports_http(username, password, specific_date, download_path, client=client, log=log,
+                                     end_date=end_date):
+                return True
+            clear_report_dirs(download_path)
+        if engine == "http":
+            return False
+        log("Falling back to the browser download...", "warning")
+    # Selenium and webdriver_manager are only loaded once a browser download runs
+    from rms_browser import automate_report_download
+    return automate_report_download(username, password, specific_date, download_path, log=log, end_date=end_date)
+
+
+# Function to count the logged-in browser sessions waiting in the pool
+def warm_browser_sessions():
+    # Without a browser download in this process there is no pool, and no need to load one
+    rms_browser = sys.modules.get("rms_browser")
+    return rms_browser.get_browser_pool().idle_sessions() if rms_browser is not None else 0
+
+
+# Function to quit the pooled browser sessions, if a browser download ever ran
+def close_browser_sessions():
+    rms_browser = sys.modules.get("rms_browser")
+    if rms_browser is not None:
+        rms_browser.close_browser_pool()
+
+
+# ---------------- Scheduled Pipeline ----------------
+class PulsePipeline:
+    """One download -> ingest -> aggregate -> notify cycle per call to `run_cycle`.
+
+    The RMS HTTP client stays open (and logged in) between cycles, and browser
+    downloads use the process-wide pool of warm sessions. The downloaded
+    reports are content-hashed, and a cycle whose reports are identical to the last
+    processed ones stops there: nothing is parsed, counted or sent again.
+    """
+
+    def __init__(self, username, password, download_path, engine=DEFAULT_ENGINE, zones=None, start_time=None,
+                 username_file=USERNAME_FILE, bot_token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID,
+                 dry_run=False, workers=1, log=log_progress):
+        self.username = username
+        self.password = password
+        self.download_path = download_path
+        self.engine = engine
+        self.zones = zone_priority if zones is None else list(zones)
+        # Time of day on the report date after which alarms are counted
+        self.start_time = datetime.min.time() if start_time is None else start_time
+        self.username_file = username_file
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.dry_run = dry_run
+        # With more than one worker, reports are counted in worker processes without merging
+        self.workers = workers
+        self.log = log
+        self.client = None
+        self.last_fingerprint = None
+        # Per-site rates across cycles; each cycle only adds the alarms it hasn't seen
+        self.rollup = AlarmRollup()
+
+    def download(self, report_date):
+        """Download both reports for `report_date`; returns their ZIP paths or None"""
+        if self.client is None and self.engine in ("auto", "http"):
+            self.client = RmsHttpClient(pool_size=len(REPORT_TYPES))
+        if not download_reports(self.username, self.password, report_date, self.download_path, engine=self.engine,
+                                client=self.client, log=self.log):
+            return None
+
+        report_files = [find_report_zip(self.download_path, report_type) for report_type in REPORT_TYPES]
+        return report_files if all(report_files) else None
+
+    def run_cycle(self, now=None):
+        """Run one cycle; returns {zone: DeliveryResult} (or {zone: message} on a dry run),
+        or None when the download failed or the reports haven't changed"""
+        now = datetime.now() if now is None else now
+        timer = StepTimer("Cycle")
+
+        with timer.step("download"):
+            report_files = self.download(now.date())
+        if report_files is None:
+            self.log("Failed to download reports.", "error")
+            return None
+
+        # A fresh export of unchanged alarms still has new ZIP bytes, so "unchanged" is
+        # judged on the parsed alarms (report_cache.alarm_fingerprint), not the files
+        report_keys = tuple(file_content_hash(report_file) for report_file in report_files)
+        start_time_filter = datetime.combine(now.date(), self.start_time)
+        if self.workers > 1:
+            from parallel_counts import scan_report_files
+
+            # The rollup takes each report's alarms as its worker finishes; updating it
+            # before the unchanged check is harmless, as alarms already seen add nothing
+            with timer.step("aggregate"):
+                summary_df, fingerprint = scan_report_files(list(zip(report_files, REPORT_TYPES)), start_time_filter,
+                                                            max_workers=self.workers, rollup=self.rollup)
+            if fingerprint == self.last_fingerprint:
+                self.log("Reports unchanged since the last cycle; skipping.")
+                return None
+        else:
+            with timer.step("ingest"):
+                merged_df = ingest_reports(*report_files, report_keys=report_keys)
+                fingerprint = alarm_fingerprint(merged_df)
+            if fingerprint == self.last_fingerprint:
+                self.log("Reports unchanged since the last cycle; skipping.")
+                return None
+            with timer.step("aggregate"):
+                summary_df = count_entries_by_zone(merged_df, start_time_filter)
+            with timer.step("rollup"):
+                self.rollup.update(merged_df)
+        zone_tables = split_by_zone(summary_df)
+        bursts = self.rollup.bursts(now)
+        if not bursts.empty:
+            self.log(f"🚨 {len(bursts)} sites bursting: " + ", ".join(bursts['Site Alias '].astype(str)), "warning")
+        with timer.step("notify"):
+            messages = build_zone_messages(self.zones, zone_tables, start_time_filter,
+                                           load_username_roster(self.username_file), bursts=bursts, bursts_as_of=now)
+            if self.dry_run:
+                for message in messages.values():
+                    self.log(message)
+                results = messages
+            else:
+                results = send_zone_messages(messages, self.bot_token, self.chat_id)
+                for zone, result in results.items():
+                    if not result.ok:
+                        self.log(f"Failed to send data for {zone} to Telegram: {result.error}", "error")
+
+        # Only a fully processed pair of reports counts as seen
+        self.last_fingerprint = fingerprint
+        self.log("Cycle done: " + ", ".join(f"{record['Step']} {record['Seconds']}s" for record in timer.records)
+                 + f"; {len(messages)} zone alerts")
+        return results
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+
+# Function to run pipeline cycles every `interval` seconds until interrupted
+def run_scheduled(pipeline, interval, max_cycles=None):
+    """Cycles start on a fixed schedule; one that overruns the interval is followed
+    immediately by the next rather than by a burst of catch-up cycles. A failing
+    cycle is logged and the schedule carries on."""
+    cycles = 0
+    next_run = time.monotonic()
+    while True:
+        try:
+            pipeline.run_cycle()
+        except Exception:
+            logger.exception("Pipeline cycle failed")
+        cycles += 1
+        if max_cycles is not None and cycles >= max_cycles:
+            return
+        next_run = max(next_run + interval, time.monotonic())
+        # The clock is read again here, so an overrun leaves a slightly negative wait
+        time.sleep(max(0.0, next_run - time.monotonic()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--username", default=os.environ.get("RMS_USERNAME", "akib"))
+    parser.add_argument("--password", default=os.environ.get("RMS_PASSWORD"))
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE)
+    parser.add_argument("--every", type=float, default=DEFAULT_INTERVAL_MINUTES, metavar="MINUTES",
+                        help="minutes between cycle starts")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--zones", nargs="+", default=None, help="zones to alert (default: the priority zones)")
+    parser.add_argument("--since", type=lambda value: datetime.strptime(value, "%H:%M").time(), default=None,
+                        metavar="HH:MM", help="count alarms that started after this time of day (default 00:00)")
+    parser.add_argument("--download-dir", default=None)
+    parser.add_argument("--dry-run", action="store_true", help="log the alerts instead of sending them")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes that parse and count the reports in parallel (default: 1, in-process)")
+    args = parser.parse_args(argv)
+
+    if args.password is None:
+        parser.error("an RMS password is required (--password or RMS_PASSWORD)")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    download_path = args.download_dir or tempfile.mkdtemp(prefix="pulseforge_")
+    pipeline = PulsePipeline(args.username, args.password, download_path, engine=args.engine, zones=args.zones,
+                             start_time=args.since, dry_run=args.dry_run, workers=args.workers)
+    try:
+        run_scheduled(pipeline, args.every * 60, max_cycles=1 if args.once else None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.close()
+        close_browser_sessions()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from xlsx_stream import iter_report_batches
+
+# ---------------- Report Ingest Settings ----------------
+# Only these columns of the RMS export are used by PulseForge
+REPORT_COLUMNS = ['Zone', 'Site Alias ', 'Start Time', 'End Time']
+CATEGORY_COLUMNS = ['Zone', 'Site Alias ']
+DATE_COLUMNS = ['Start Time', 'End Time']
+
+# Parsed reports are kept as Parquet files here, keyed by the workbook content hash
+REPORT_CACHE_DIR = os.environ.get("PULSEFORGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pulseforge_cache"))
+# Number of parsed reports kept in memory between Streamlit reruns
+MEMORY_CACHE_SIZE = 8
+# Number of parsed reports kept on disk; the least recently used go first
+DISK_CACHE_SIZE = int(os.environ.get("PULSEFORGE_CACHE_FILES", "64"))
+
+# This module is imported (not re-run) by Streamlit, so the cache survives reruns
+_memory_cache = OrderedDict()
+
+
+# Function to hash the content of an uploaded file or a file path
+def file_content_hash(report_file):
+    """Return a hex digest of the workbook bytes, used as the cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(report_file, str):
+        with open(report_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    elif hasattr(report_file, 'getvalue'):
+        digest.update(report_file.getvalue())
+    else:
+        report_file.seek(0)
+        for chunk in iter(lambda: report_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+        report_file.seek(0)
+    return digest.hexdigest()
+
+
+# Function to fingerprint the alarms in a parsed report, independent of the file around them
+def alarm_fingerprint(df):
+    """(rows, sum of row hashes mod 2**64) over the alarm columns present.
+
+    A fresh export of the same alarms gives the same fingerprint even though its ZIP
+    bytes differ (archive timestamps, generation-time banner). Row order doesn't
+    matter, so the fingerprints of a report's batches add up (combine_fingerprints)
+    to the fingerprint of the whole report.
+    """
+    columns = [col for col in ['Type'] + REPORT_COLUMNS if col in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    # uint64 sums wrap around, which is the mod 2**64 wanted here
+    return len(df), int(row_hashes.sum(dtype=np.uint64))
+
+
+def combine_fingerprints(fingerprints):
+    fingerprints = list(fingerprints)
+    return sum(rows for rows, _ in fingerprints), sum(total for _, total in fingerprints) % 2 ** 64
+
+
+# Function to shrink a report to the needed columns with compact dtypes
+def compact_report(df):
+    df = df[[col for col in REPORT_COLUMNS if col in df.columns]].copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+# Function to parse an RMS report workbook (two banner rows, header on the third row)
+def read_report_workbook(report_file):
+    """Parse a report .xlsx, or the ZIP it was downloaded in, with the streaming reader"""
+    if hasattr(report_file, 'seek'):
+        report_file.seek(0)
+    batches = list(iter_report_batches(report_file, usecols=REPORT_COLUMNS))
+    return compact_report(pd.concat(batches, ignore_index=True))
+
+
+def _cache_path(key):
+    return os.path.join(REPORT_CACHE_DIR, f"{key}.parquet")
+
+
+def _read_disk_cache(key):
+    path = _cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        # A corrupt or unreadable cache entry is simply re-parsed
+        return None
+    try:
+        # The modification time doubles as the last use, for _prune_disk_cache
+        os.utime(path)
+    except OSError:
+        pass
+    return df
+
+
+def _write_disk_cache(key, df):
+    path = _cache_path(key)
+    try:
+        os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except (ImportError, OSError, ValueError):
+        # The disk cache is best effort; without pyarrow we still have the memory cache
+        return
+    _prune_disk_cache()
+
+
+# Function to remove the least recently used cached reports beyond DISK_CACHE_SIZE
+def _prune_disk_cache():
+    entries = []
+    try:
+        with os.scandir(REPORT_CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(".parquet"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+    except OSError:
+        return
+    entries.sort(reverse=True)
+    for _, path in entries[DISK_CACHE_SIZE:]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Already removed by another process sharing the cache directory
+            pass
+
+
+def _remember(key, df):
+    _memory_cache[key] = df
+    _memory_cache.move_to_end(key)
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+# Function to load a report through the memory and disk caches
+def load_report(report_file, key=None):
+    """Parse a report workbook once and serve later calls from the cache.
+
+    `key` is the file_content_hash of the workbook, if the caller already has it.
+    Returns a copy, so callers may add columns (e.g. 'Type') freely.
+    """
+    if key is None:
+        key = file_content_hash(report_file)
+
+    df = _memory_cache.get(key)
+    if df is None:
+        df = _read_disk_cache(key)
+        if df is None:
+            df = read_report_workbook(report_file)
+            _write_disk_cache(key, df)
+    _remember(key, df)
+    return df.copy()
+
+
+# Function to drop all cached reports (memory and disk)
+def clear_report_cache():
+    _memory_cache.clear()
+    if os.path.isdir(REPORT_CACHE_DIR):
+        for name in os.listdir(REPORT_CACHE_DIR):
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(REPORT_CACHE_DIR, name))
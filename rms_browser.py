@@ -0,0 +1,522 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from selenium import webdriver
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.firefox.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from webdriver_manager.firefox import GeckoDriverManager
+
+from alarm_counts import ALARM_TYPES
+from progress import StepTimer, log_progress
+
+# ---------------- RMS Browser Automation ----------------
+# Exports the alarm reports through the RMS web UI with headless Firefox. Progress goes
+# to `log(message, level)` (see progress.log_progress), never straight to Streamlit.
+
+RMS_URL = "https://rms.eyeelectronics.net/"
+# Longest wait for a clicked export to finish downloading, in seconds
+DOWNLOAD_TIMEOUT = 120
+# Longest wait for a clicked search to show that it started, in seconds
+SEARCH_START_TIMEOUT = 10
+# Alarm types exported by default, the same ones the counts cover; each one gets its own browser session
+REPORT_TYPES = ALARM_TYPES
+# Upper bound on concurrent headless Firefox sessions
+MAX_BROWSER_SESSIONS = 3
+# Pooled sessions left idle for longer than this are shut down, in seconds
+SESSION_IDLE_TIMEOUT = 30 * 60
+# Longest wait for a pooled session when all of them are busy, in seconds
+SESSION_ACQUIRE_TIMEOUT = 15 * 60
+
+USERNAME_XPATH = "//input[@placeholder='Username']"
+RMS_STATION_XPATH = "//span[text()='Rms Station']"
+REPORT_BUTTON_XPATH = "//span[@class='p-button-label' and text()='Report']"
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+# ---------------- Firefox Download Options ----------------
+def set_firefox_download_options(options):
+    options.set_preference("browser.download.folderList", 2)
+    options.set_preference("browser.download.manager.showWhenStarting", False)
+    options.set_preference("browser.download.dir", "C:\\Downloads")  # Change if needed
+    options.set_preference("browser.helperApps.neverAsk.saveToDisk",
+                           "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet, application/zip")
+    options.set_preference("browser.download.manager.useWindow", False)
+    options.set_preference("browser.download.manager.showAlertOnComplete", False)
+    options.set_preference("browser.download.manager.closeWhenDone", True)
+    return options
+
+
+# ---------------- Date Picker Utility ----------------
+CALENDAR_TITLE_XPATH = "//div[contains(@class,'p-datepicker-title')]"
+
+
+def calendar_month_offset(header_text, date_obj):
+    """Months between the month the calendar shows ("October 2024") and the target date"""
+    shown = datetime.strptime(" ".join(header_text.split()), "%B %Y")
+    return (date_obj.year - shown.year) * 12 + (date_obj.month - shown.month)
+
+
+def select_date(wait, driver, input_xpath, date_obj, label, log=log_progress):
+    log(f"📅 Selecting {label} ({date_obj.strftime('%d-%m-%Y')})...")
+
+    input_field = wait.until(EC.element_to_be_clickable((By.XPATH, input_xpath)))
+    input_field.click()
+    header_element = wait.until(EC.visibility_of_element_located((By.XPATH, CALENDAR_TITLE_XPATH)))
+
+    target_month = date_obj.strftime("%B")
+    target_year = date_obj.strftime("%Y")
+    target_day = str(date_obj.day)
+
+    def showing_target(driver):
+        header = driver.find_element(By.XPATH, CALENDAR_TITLE_XPATH).text
+        return target_month in header and target_year in header
+
+    current_header = header_element.text
+    log(f"📖 Calendar currently showing: {current_header}")
+    try:
+        offset = calendar_month_offset(current_header, date_obj)
+    except ValueError:
+        offset = None
+
+    if offset:
+        # Jump straight to the target month: all prev/next clicks go out in one script call
+        button_class = "p-datepicker-next" if offset > 0 else "p-datepicker-prev"
+        driver.execute_script(
+            "const button = document.querySelector(arguments[0]);"
+            "for (let i = 0; i < arguments[1]; i++) { button.click(); }",
+            f"button.{button_class}", abs(offset))
+        wait.until(showing_target)
+    elif offset is None:
+        # Unrecognised header format: step back one month at a time until it matches
+        while not showing_target(driver):
+            previous_header = driver.find_element(By.XPATH, CALENDAR_TITLE_XPATH).text
+            driver.find_element(By.XPATH, "//button[contains(@class,'p-datepicker-prev')]").click()
+            wait.until(lambda d: d.find_element(By.XPATH, CALENDAR_TITLE_XPATH).text != previous_header)
+
+    day_elements = driver.find_elements(By.XPATH, f"//td[not(contains(@class,'p-datepicker-other-month'))]//span[text()='{target_day}']")
+    log(f"✅ Found {len(day_elements)} day elements for {target_day}")
+    if len(day_elements) == 0:
+        raise Exception(f"No matching day found for {target_day} in current calendar view.")
+    day_elements[0].click()
+    log(f"✅ Clicked {label} successfully.")
+
+
+# ---------------- Export and Download ----------------
+def export_and_download(wait, driver, report_type, log=log_progress):
+    log(f"📤 Clicking Export button for {report_type} and selecting XLSX...")
+    export_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[.//span[text()='Export']]")))
+    driver.execute_script("arguments[0].click();", export_button)
+
+    xlsx_option = wait.until(EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'p-overlaypanel-content')]//span[text()='XLSX']")))
+    driver.execute_script("arguments[0].click();", xlsx_option)
+    log(f"✅ {report_type} XLSX export triggered. Waiting for download link popup...")
+
+    try:
+        download_link = WebDriverWait(driver, 600).until(
+            EC.element_to_be_clickable((By.XPATH, f"//div[contains(@class,'p-toast-summary') and contains(text(),'{report_type.lower()}_report')]"))
+        )
+        log(f"✅ Download link found: {download_link.text}")
+        driver.execute_script("arguments[0].click();", download_link)
+        log(f"✅ {report_type} download link clicked successfully!", "success")
+        return True
+    except:
+        log(f"❌ Timeout: {report_type} download link did not appear within 10 mins.", "error")
+        return False
+
+
+# Function to check for a finished download: a non-empty ZIP and no Firefox .part file left
+def completed_download(download_dir):
+    names = os.listdir(download_dir)
+    if any(name.endswith('.part') for name in names):
+        return None
+    zips = [os.path.join(download_dir, name) for name in names if name.endswith('.zip')]
+    return next((path for path in zips if os.path.getsize(path) > 0), None)
+
+
+def wait_for_download(driver, download_dir, timeout=DOWNLOAD_TIMEOUT):
+    return WebDriverWait(driver, timeout).until(lambda _: completed_download(download_dir))
+
+
+# Function to tell whether a clicked search has started: the loading overlay shows, or
+# the table body from before the click has been replaced
+def search_started(driver, old_table_body):
+    try:
+        if any(overlay.is_displayed() for overlay in driver.find_elements(By.CSS_SELECTOR, ".p-datatable-loading-overlay")):
+            return True
+    except StaleElementReferenceException:
+        return True
+    return bool(old_table_body) and EC.staleness_of(old_table_body[0])(driver)
+
+
+# ---------------- Main Report Logic ----------------
+def run_report(driver, wait, start_date, end_date, report_type, timer, log=log_progress):
+    log(f"🔍 Running {report_type} report from {start_date.strftime('%d-%m-%Y')} to {end_date.strftime('%d-%m-%Y')}")
+
+    with timer.step("date pick"):
+        select_date(wait, driver, "//input[@placeholder='Enter Start Date' or @id='startDate']", start_date, "Start Date", log)
+        select_date(wait, driver, "//input[@placeholder='Enter End Date' or @id='endDate']", end_date, "End Date", log)
+
+    with timer.step("search"):
+        log("🔍 Clicking Search button...")
+        search_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//span[@class='p-button-label' and text()='Search']")))
+        old_table_body = driver.find_elements(By.CSS_SELECTOR, ".p-datatable-tbody")
+        driver.execute_script("arguments[0].click();", search_button)
+        # The overlay may not have rendered yet right after the click, so first wait for the
+        # search to start, then for the table's loading overlay to be gone
+        try:
+            WebDriverWait(driver, SEARCH_START_TIMEOUT).until(lambda d: search_started(d, old_table_body))
+        except TimeoutException:
+            log("⚠️ Search showed no loading overlay or new results; continuing", "warning")
+        wait.until(EC.invisibility_of_element_located((By.CSS_SELECTOR, ".p-datatable-loading-overlay")))
+
+    with timer.step("export"):
+        return export_and_download(wait, driver, report_type, log)
+
+
+# ---------------- Automation Functions ----------------
+# Function to get the geckodriver binary, resolved once per process
+def resolve_driver_path(log=log_progress):
+    """GECKODRIVER_PATH, if set, skips webdriver_manager (and its network check) entirely"""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = os.environ.get("GECKODRIVER_PATH")
+            if not _driver_path:
+                log("🌐 Resolving geckodriver...")
+                _driver_path = GeckoDriverManager().install()
+        return _driver_path
+
+
+def start_firefox(driver_path, download_dir, headless=True):
+    firefox_options = webdriver.FirefoxOptions()
+    firefox_options = set_firefox_download_options(firefox_options)
+
+    # Set download path
+    firefox_options.set_preference("browser.download.dir", download_dir)
+    if headless:
+        firefox_options.add_argument("-headless")
+
+    return webdriver.Firefox(service=Service(driver_path), options=firefox_options)
+
+
+def log_in(driver, wait, username, password, timer, log=log_progress):
+    with timer.step("login"):
+        log("🌐 Navigating to RMS website...")
+        driver.get(RMS_URL)
+
+        log("🔐 Logging in...")
+        wait.until(EC.presence_of_element_located((By.XPATH, USERNAME_XPATH))).send_keys(username)
+        driver.find_element(By.XPATH, "//input[@placeholder='Password']").send_keys(password)
+        driver.find_element(By.XPATH, "//span[text()='Login']").click()
+        # Logged in once the login form has gone away
+        wait.until(EC.invisibility_of_element_located((By.XPATH, USERNAME_XPATH)))
+
+
+def navigate_to_alarm_report(driver, wait, timer, log=log_progress):
+    with timer.step("navigation"):
+        log("📊 Navigating to Alarm Report...")
+        rms_station_btn = wait.until(EC.element_to_be_clickable((By.XPATH, RMS_STATION_XPATH)))
+        driver.execute_script("arguments[0].click();", rms_station_btn)
+
+        alarm_link = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[normalize-space()='Alarm']")))
+        driver.execute_script("arguments[0].click();", alarm_link)
+
+        report_button = wait.until(EC.element_to_be_clickable((By.XPATH, REPORT_BUTTON_XPATH)))
+        driver.execute_script("arguments[0].click();", report_button)
+
+
+def open_alarm_report(driver, wait, username, password, timer, log=log_progress):
+    log_in(driver, wait, username, password, timer, log)
+    navigate_to_alarm_report(driver, wait, timer, log)
+
+
+# Function to tell, after a reload, whether the page shows the login form, the Alarm page or the menu
+def current_view(driver):
+    if any(element.is_displayed() for element in driver.find_elements(By.XPATH, USERNAME_XPATH)):
+        return "login"
+    if driver.find_elements(By.XPATH, REPORT_BUTTON_XPATH):
+        return "alarm"
+    if driver.find_elements(By.XPATH, RMS_STATION_XPATH):
+        return "menu"
+    return False
+
+
+def select_report_type(wait, driver, report_type):
+    dropdown_trigger = wait.until(EC.element_to_be_clickable((By.XPATH, "//div[@class='p-multiselect-trigger']")))
+    driver.execute_script("arguments[0].click();", dropdown_trigger)
+    option_to_select = wait.until(EC.element_to_be_clickable((By.XPATH, f"//span[text()='{report_type}']")))
+    driver.execute_script("arguments[0].click();", option_to_select)
+
+
+# ---------------- Warm Browser Sessions ----------------
+def credentials_key(username, password):
+    """Sessions are only reused for the exact login they were opened with"""
+    return hashlib.blake2b(f"{username}\0{password}".encode(), digest_size=16).hexdigest()
+
+
+class BrowserSession:
+    """A headless Firefox logged in to RMS, downloading into a directory of its own"""
+
+    def __init__(self, driver_path, username, password):
+        self.username = username
+        self.key = credentials_key(username, password)
+        self.download_dir = tempfile.mkdtemp(prefix="pulseforge_firefox_")
+        try:
+            self.driver = start_firefox(driver_path, self.download_dir)
+        except Exception:
+            shutil.rmtree(self.download_dir, ignore_errors=True)
+            raise
+        self.wait = WebDriverWait(self.driver, 20)
+        self.logged_in = False
+        self.last_used = time.monotonic()
+
+    def prepare(self, password, timer, log=log_progress):
+        """Bring the session to a fresh Alarm report form, logging in only when needed"""
+        if not self.logged_in:
+            open_alarm_report(self.driver, self.wait, self.username, password, timer, log)
+            self.logged_in = True
+            return
+
+        with timer.step("session check"):
+            # Reloading also clears the previous export's selections and toasts
+            self.driver.refresh()
+            view = self.wait.until(current_view)
+        if view == "login":
+            log("🔐 Session expired, logging in again...")
+            open_alarm_report(self.driver, self.wait, self.username, password, timer, log)
+        elif view == "menu":
+            navigate_to_alarm_report(self.driver, self.wait, timer, log)
+        else:
+            with timer.step("navigation"):
+                report_button = self.wait.until(EC.element_to_be_clickable((By.XPATH, REPORT_BUTTON_XPATH)))
+                self.driver.execute_script("arguments[0].click();", report_button)
+
+    def clear_downloads(self):
+        for name in os.listdir(self.download_dir):
+            os.remove(os.path.join(self.download_dir, name))
+
+    def close(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        shutil.rmtree(self.download_dir, ignore_errors=True)
+
+
+class BrowserPool:
+    """Logged-in browser sessions kept warm across exports (and Streamlit reruns).
+
+    At most `max_sessions` browsers exist at once. A session that failed an export is
+    shut down instead of returned; idle ones are shut down after `idle_timeout`
+    seconds, and all of them when the pool is closed (at the latest at exit).
+    """
+
+    def __init__(self, max_sessions=MAX_BROWSER_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._busy = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        threading.Thread(target=self._reap_idle, name="browser-pool-reaper", daemon=True).start()
+
+    def _take_expired(self):
+        """Remove and return the idle sessions past their timeout; call with the lock held"""
+        now = time.monotonic()
+        expired = [session for session in self._idle if now - session.last_used > self.idle_timeout]
+        self._idle = [session for session in self._idle if session not in expired]
+        return expired
+
+    def _reap_idle(self):
+        while True:
+            with self._cond:
+                self._cond.wait(timeout=min(60, self.idle_timeout))
+                if self._closed:
+                    return
+                expired = self._take_expired()
+            for session in expired:
+                session.close()
+
+    def acquire(self, driver_path, username, password, timeout=SESSION_ACQUIRE_TIMEOUT, fresh=False):
+        """An idle session with these credentials (most recently used first), else a new
+        one; always a new one with `fresh`"""
+        key = credentials_key(username, password)
+        deadline = time.monotonic() + timeout
+        retired = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is closed")
+                    retired += self._take_expired()
+                    for session in reversed(self._idle):
+                        if session.key == key and not fresh:
+                            self._idle.remove(session)
+                            self._busy += 1
+                            return session
+                    if self._idle and self._busy + len(self._idle) >= self.max_sessions:
+                        # Full, but with idle sessions of another login: make room
+                        retired.append(self._idle.pop(0))
+                    if self._busy + len(self._idle) < self.max_sessions:
+                        self._busy += 1
+                        break
+                    if not self._cond.wait(timeout=max(0, deadline - time.monotonic())) and time.monotonic() >= deadline:
+                        raise TimeoutError(f"No browser session became free within {timeout} s")
+        finally:
+            for session in retired:
+                session.close()
+
+        try:
+            return BrowserSession(driver_path, username, password)
+        except Exception:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify_all()
+            raise
+
+    def release(self, session, reusable=True):
+        with self._cond:
+            self._busy -= 1
+            keep = reusable and not self._closed
+            if keep:
+                session.last_used = time.monotonic()
+                self._idle.append(session)
+            self._cond.notify_all()
+        if not keep:
+            session.close()
+
+    def idle_sessions(self):
+        with self._cond:
+            return len(self._idle)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            sessions, self._idle = self._idle, []
+            self._cond.notify_all()
+        for session in sessions:
+            session.close()
+
+
+# Function to get the process-wide browser pool, shared across Streamlit reruns and pipeline cycles
+def get_browser_pool():
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool()
+            atexit.register(_browser_pool.close)
+        return _browser_pool
+
+
+# Function to shut down every pooled browser session
+def close_browser_pool():
+    global _browser_pool
+    with _browser_pool_lock:
+        pool, _browser_pool = _browser_pool, None
+    if pool is not None:
+        pool.close()
+        atexit.unregister(pool.close)
+
+
+# Function to export one alarm type in a pooled browser session
+def export_report_in_session(pool, driver_path, username, password, specific_date, report_type, download_dir, timer,
+                             log=log_progress, end_date=None):
+    log(f"🌐 Getting a browser session for {report_type}...")
+    session = None
+    reusable = False
+    try:
+        with timer.step("browser start"):
+            session = pool.acquire(driver_path, username, password)
+        try:
+            session.prepare(password, timer, log)
+        except Exception as e:
+            if not session.logged_in:
+                raise
+            # A pooled browser may have died while idle (crashed, killed, machine slept), which
+            # surfaces as a WebDriver or connection error: drop it and start over once in a new one
+            log(f"♻️ Browser session is no longer usable ({type(e).__name__}), starting a new one...", "warning")
+            pool.release(session, reusable=False)
+            session = None
+            with timer.step("browser start"):
+                session = pool.acquire(driver_path, username, password, fresh=True)
+            session.prepare(password, timer, log)
+        session.clear_downloads()
+
+        log(f"📄 Downloading {report_type} Report", "header")
+        select_report_type(session.wait, session.driver, report_type)
+        end_date = specific_date if end_date is None else end_date
+        if not run_report(session.driver, session.wait, specific_date, end_date, report_type, timer, log):
+            return False
+
+        with timer.step("download"):
+            zip_path = wait_for_download(session.driver, session.download_dir)
+            zip_path = shutil.move(zip_path, os.path.join(download_dir, os.path.basename(zip_path)))
+        log(f"✅ {report_type} report saved: {os.path.basename(zip_path)}")
+        reusable = True
+        return True
+
+    except Exception as e:
+        log(f"❌ Error occurred while exporting {report_type}: {e}", "error")
+        log(f"Full error details: {traceback.format_exc()}", "error")
+        return False
+    finally:
+        # Only a session that just exported cleanly goes back to the pool
+        if session is not None:
+            pool.release(session, reusable)
+
+
+def automate_report_download(username, password, specific_date, download_path, report_types=None,
+                             max_sessions=MAX_BROWSER_SESSIONS, timings=None, log=log_progress, thread_setup=None,
+                             pool=None, end_date=None):
+    """Export every report type concurrently, each in a warm session from `pool`.
+
+    Each type downloads into its own `download_path/<type>` directory, so the total
+    wall time is that of the slowest export rather than the sum of all of them.
+    Sessions come from the process-wide pool unless one is passed, so repeat
+    downloads skip browser startup and login. Per-step timings are appended to
+    `timings` (a list) when one is passed, and `thread_setup` is called first thing
+    in every worker thread. With an `end_date`, the reports cover `specific_date`
+    through `end_date`.
+    """
+    report_types = REPORT_TYPES if report_types is None else list(report_types)
+    pool = get_browser_pool() if pool is None else pool
+
+    try:
+        # Resolve geckodriver once; concurrent installs would race on the same cache
+        driver_path = resolve_driver_path(log)
+    except Exception as e:
+        log(f"❌ Error occurred: {e}", "error")
+        return False
+
+    timers = [StepTimer(report_type) for report_type in report_types]
+
+    def export(report_type, timer):
+        if thread_setup is not None:
+            thread_setup()
+        report_dir = os.path.join(download_path, report_type.lower())
+        os.makedirs(report_dir, exist_ok=True)
+        return export_report_in_session(pool, driver_path, username, password, specific_date, report_type, report_dir, timer,
+                                        log, end_date)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_sessions, len(report_types)))) as pool_threads:
+        results = list(pool_threads.map(export, report_types, timers))
+
+    if timings is not None:
+        for timer in timers:
+            timings.extend(timer.records)
+    return all(results)
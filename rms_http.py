@@ -0,0 +1,114 @@
+import os
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---------------- RMS HTTP Endpoints ----------------
+# UNVERIFIED PLACEHOLDERS: the paths, payload keys, job statuses and token keys below are
+# assumptions, not taken from the Alarm page's network traffic. Confirm them against the
+# real RMS before making "http" a default engine. benchmarks/rms_stub_server.py serves
+# exactly these; point RMS_BASE_URL at it to exercise the client.
+RMS_BASE_URL = os.environ.get("RMS_BASE_URL", "https://rms.eyeelectronics.net")
+# Until then the HTTP engine is only offered (app, pipeline and backfill) with RMS_HTTP_ENABLED=1
+RMS_HTTP_ENABLED = os.environ.get("RMS_HTTP_ENABLED") == "1"
+LOGIN_PATH = "/api/auth/login"
+EXPORT_PATH = "/api/alarm/report/export"
+EXPORT_STATUS_PATH = "/api/alarm/report/export/{job_id}"
+EXPORT_DOWNLOAD_PATH = "/api/alarm/report/export/{job_id}/download"
+
+REQUEST_TIMEOUT = 30
+EXPORT_TIMEOUT = 600
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class RmsExportError(Exception):
+    """Raised when the RMS API rejects a login or an export job fails"""
+
+
+class RmsHttpClient:
+    """Exports RMS alarm reports over plain HTTP, without a browser.
+
+    One pooled `requests.Session` is reused for login, export, polling and download,
+    so a client can serve several exports (also concurrently) after a single login.
+    """
+
+    def __init__(self, base_url=RMS_BASE_URL, pool_size=4, timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.logged_in = False
+
+    def _url(self, path, **params):
+        return self.base_url + path.format(**params)
+
+    def _check(self, response, action):
+        if not response.ok:
+            raise RmsExportError(f"{action} failed: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def login(self, username, password):
+        response = self.session.post(self._url(LOGIN_PATH), json={"username": username, "password": password},
+                                     timeout=self.timeout)
+        self._check(response, "Login")
+        # Token based auth is sent as a header; cookie based auth is kept by the session itself
+        body = response.json() if response.content else {}
+        token = body.get("token") or body.get("accessToken") or body.get("access_token")
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.logged_in = True
+
+    def start_export(self, report_type, start_date, end_date):
+        payload = {
+            "alarmTypes": [report_type],
+            "startDate": start_date.strftime("%Y-%m-%d"),
+            "endDate": end_date.strftime("%Y-%m-%d"),
+            "format": "XLSX",
+        }
+        response = self._check(self.session.post(self._url(EXPORT_PATH), json=payload, timeout=self.timeout),
+                               f"{report_type} export")
+        body = response.json()
+        job_id = body.get("jobId") or body.get("id")
+        if job_id is None:
+            raise RmsExportError(f"{report_type} export returned no job id: {body}")
+        return job_id
+
+    def wait_for_export(self, job_id, timeout=EXPORT_TIMEOUT, first_delay=1.0, max_delay=15.0):
+        """Poll the export job with exponential backoff until it is ready"""
+        deadline = time.monotonic() + timeout
+        delay = first_delay
+        while True:
+            response = self._check(self.session.get(self._url(EXPORT_STATUS_PATH, job_id=job_id), timeout=self.timeout),
+                                   "Export status")
+            status = str(response.json().get("status", "")).upper()
+            if status in ("DONE", "COMPLETED", "READY", "SUCCESS"):
+                return
+            if status in ("FAILED", "ERROR"):
+                raise RmsExportError(f"Export job {job_id} failed")
+            if time.monotonic() + delay > deadline:
+                raise RmsExportError(f"Export job {job_id} did not finish within {timeout} s")
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    def download_export(self, job_id, download_dir, default_name):
+        """Stream the export ZIP to disk in chunks; returns the saved path"""
+        url = self._url(EXPORT_DOWNLOAD_PATH, job_id=job_id)
+        with self._check(self.session.get(url, stream=True, timeout=self.timeout), "Download") as response:
+            match = re.search(r'filename="?([^";]+)"?', response.headers.get("Content-Disposition", ""))
+            file_name = os.path.basename(match.group(1)) if match else default_name
+            path = os.path.join(download_dir, file_name)
+            # Write to a .part file first, like a browser, so a partial file is never picked up
+            with open(path + ".part", "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        os.replace(path + ".part", path)
+        return path
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,64 @@
+import html
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------- Zone Table Rendering ----------------
+# Plain HTML tables whose cell colours are CSS classes computed per column, instead of
+# a pandas Styler that styles every row separately and inlines a CSS rule per cell.
+
+COUNT_COLUMNS = ['Motion Count', 'Vibration Count']
+TABLE_CLASS = "pf-zone-table"
+# Colours for cells with 10+ alarms ("high") and with at least one ("some")
+THEME_COLOURS = {
+    "dark": {"high": "#8B0000", "some": "#505050"},
+    "light": {"high": "lightcoral", "some": "lightgray"},
+}
+HTML_CACHE_SIZE = 256
+
+_html_cache = OrderedDict()
+
+
+# Function to build the CSS shared by every zone table on the page
+def table_css(theme):
+    colours = THEME_COLOURS[theme]
+    return (
+        "<style>"
+        f".{TABLE_CLASS} td {{font-size: 12px; padding: 4px;}}"
+        f".{TABLE_CLASS} td.pf-high {{background-color: {colours['high']}; color: white;}}"
+        f".{TABLE_CLASS} td.pf-some {{background-color: {colours['some']};}}"
+        "</style>"
+    )
+
+
+# Function to pick the colour class of every count in a column at once
+def count_classes(counts):
+    counts = np.asarray(counts)
+    return np.select([counts >= 10, counts > 0], [' class="pf-high"', ' class="pf-some"'], default='')
+
+
+# Function to render a zone's site table as HTML (styled by table_css)
+def render_styled_table(df):
+    header = "".join(f"<th>{html.escape(str(col))}</th>" for col in df.columns)
+    cells = []
+    for col in df.columns:
+        text = [html.escape(str(value)) for value in df[col].tolist()]
+        if col in COUNT_COLUMNS:
+            cells.append([f"<td{cls}>{value}</td>" for cls, value in zip(count_classes(df[col].to_numpy()), text)])
+        else:
+            cells.append([f"<td>{value}</td>" for value in text])
+    rows = "".join(f"<tr>{''.join(row)}</tr>" for row in zip(*cells))
+    return f'<table class="{TABLE_CLASS}"><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>'
+
+
+# Function to render a table once per cache key and reuse the HTML afterwards
+def cached_table_html(key, df):
+    """`key` must change whenever the table content would (e.g. report hashes, zone, filter)"""
+    table_html = _html_cache.get(key)
+    if table_html is None:
+        table_html = render_styled_table(df)
+        _html_cache[key] = table_html
+        while len(_html_cache) > HTML_CACHE_SIZE:
+            _html_cache.popitem(last=False)
+    _html_cache.move_to_end(key)
+    return table_html
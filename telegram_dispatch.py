@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------------- Telegram Dispatch ----------------
+# Override TELEGRAM_API_URL to point the dispatcher at a local fake Bot API server
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+MAX_MESSAGE_LENGTH = 4096
+MAX_CONCURRENT_SENDS = 4
+MAX_ATTEMPTS = 5
+REQUEST_TIMEOUT = 10
+# Longest a whole dispatch may take, retries included, in seconds; the app waits on it
+DISPATCH_TIMEOUT = 30
+
+DeliveryResult = namedtuple("DeliveryResult", ["ok", "parts_sent", "parts_total", "error"])
+
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+
+# Function to split a message into Telegram-sized parts at line boundaries
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Split `text` into parts of at most `limit` characters.
+
+    Lines are kept whole (so HTML tags, which never span lines here, stay balanced);
+    only a single line longer than the limit is cut.
+    """
+    parts = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            parts.append(current)
+            current = line
+        else:
+            current = candidate
+    if current or not parts:
+        parts.append(current)
+    return parts
+
+
+class TelegramDispatcher:
+    """Sends Telegram messages over a pooled session, one at a time per chat.
+
+    Messages to the same chat never overlap, so a long message's parts arrive together
+    and in order; only different chats are sent to concurrently (up to `max_workers`).
+    A 429 answer pauses every sender until its `retry_after` has passed; server errors
+    and dropped connections are retried with exponential backoff, but never past the
+    dispatch's deadline. Once a chat can't be reached, its remaining messages fail
+    without being tried.
+    """
+
+    def __init__(self, bot_token, api_url=TELEGRAM_API_URL, max_workers=MAX_CONCURRENT_SENDS,
+                 max_attempts=MAX_ATTEMPTS, timeout=REQUEST_TIMEOUT):
+        self.url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._paused_until = 0.0
+        self._pause_lock = threading.Lock()
+        self._chat_locks = {}
+        self._chat_locks_lock = threading.Lock()
+
+    def _chat_lock(self, chat_id):
+        with self._chat_locks_lock:
+            return self._chat_locks.setdefault(str(chat_id), threading.Lock())
+
+    def _wait_for_rate_limit(self, deadline):
+        with self._pause_lock:
+            delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+
+    def _pause(self, seconds):
+        with self._pause_lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _backoff(self, attempt, deadline):
+        # No wait after the last attempt, nor past the deadline
+        if attempt + 1 < self.max_attempts:
+            time.sleep(min(2 ** attempt, 30, max(0.0, deadline - time.monotonic())))
+
+    def _post(self, chat_id, text, deadline):
+        """Send one message; returns (None or an error string, whether Telegram was unreachable)"""
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+        error = None
+        for attempt in range(self.max_attempts):
+            self._wait_for_rate_limit(deadline)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return error or "Gave up: the dispatch deadline passed", True
+            try:
+                response = self.session.post(self.url, data=payload, timeout=min(self.timeout, remaining))
+            except requests.RequestException as e:
+                error = str(e)
+                self._backoff(attempt, deadline)
+                continue
+
+            if response.ok:
+                return None, False
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            error = f"HTTP {response.status_code}: {body.get('description', response.text[:200])}"
+            if response.status_code == 429:
+                self._pause(body.get("parameters", {}).get("retry_after", 1))
+            elif response.status_code >= 500:
+                self._backoff(attempt, deadline)
+            else:
+                # Bad chat id, bad token, malformed HTML: retrying won't help
+                return error, False
+        return error, True
+
+    def send_message(self, chat_id, text, timeout=DISPATCH_TIMEOUT):
+        """Send one message (at most MAX_MESSAGE_LENGTH characters); returns None or an error string"""
+        return self._post(chat_id, text, time.monotonic() + timeout)[0]
+
+    def _send(self, chat_id, text, deadline):
+        """`send` until `deadline`; returns (DeliveryResult, whether Telegram was unreachable)"""
+        parts = split_message(text)
+        lock = self._chat_lock(chat_id)
+        if not lock.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return DeliveryResult(False, 0, len(parts), "Gave up: the chat stayed busy past the dispatch deadline"), True
+        try:
+            for sent, part in enumerate(parts):
+                error, unreachable = self._post(chat_id, part, deadline)
+                if error is not None:
+                    return DeliveryResult(False, sent, len(parts), error), unreachable
+        finally:
+            lock.release()
+        return DeliveryResult(True, len(parts), len(parts), None), False
+
+    def send(self, chat_id, text, timeout=DISPATCH_TIMEOUT):
+        """Send a message of any length as consecutive parts, in order.
+
+        The chat is held for the whole message, so other senders to it (other sessions,
+        the pipeline) can't slip a message in between its parts.
+        """
+        return self._send(chat_id, text, time.monotonic() + timeout)[0]
+
+    def dispatch(self, messages, chat_id, timeout=DISPATCH_TIMEOUT):
+        """Send {key: text} to `chat_id` (or to chat_id[key], when it is a dict).
+
+        Each chat gets its messages one after another in the order given; separate chats
+        are served concurrently. Everything is over within `timeout` seconds: what
+        couldn't be sent by then, or after a chat turned out unreachable, fails unsent.
+        Returns {key: DeliveryResult} in the same order.
+        """
+        deadline = time.monotonic() + timeout
+        chats = {}
+        for key in messages:
+            chats.setdefault(chat_id[key] if isinstance(chat_id, dict) else chat_id, []).append(key)
+
+        def send_chat(chat, keys):
+            results = {}
+            skip_reason = None
+            for key in keys:
+                if skip_reason is not None:
+                    results[key] = DeliveryResult(False, 0, len(split_message(messages[key])), skip_reason)
+                    continue
+                results[key], unreachable = self._send(chat, messages[key], deadline)
+                if unreachable:
+                    skip_reason = f"Not sent, Telegram unreachable: {results[key].error}"
+            return results
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chats)))) as pool:
+            futures = [pool.submit(send_chat, chat, keys) for chat, keys in chats.items()]
+        results = {}
+        for future in futures:
+            results.update(future.result())
+        return {key: results[key] for key in messages}
+
+    def close(self):
+        self.session.close()
+
+
+# Function to get the process-wide dispatcher for a bot, so its connections are reused across reruns
+def get_dispatcher(bot_token, api_url=TELEGRAM_API_URL):
+    with _dispatchers_lock:
+        key = (bot_token, api_url)
+        if key not in _dispatchers:
+            _dispatchers[key] = TelegramDispatcher(bot_token, api_url)
+        return _dispatchers[key]
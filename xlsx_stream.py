@@ -0,0 +1,185 @@
+import posixpath
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+import pandas as pd
+
+# ---------------- Streaming XLSX Reader ----------------
+# Reads the sheet XML of an RMS export row by row, straight out of the (nested) ZIP,
+# instead of building openpyxl's in-memory workbook model.
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# RMS exports have two banner rows; the column header is on the third row
+HEADER_ROW = 3
+BATCH_ROWS = 50000
+DEFAULT_COLUMNS = ['Zone', 'Site Alias ', 'Start Time', 'End Time']
+DATE_COLUMNS = ['Start Time', 'End Time']
+CATEGORY_COLUMNS = ['Zone', 'Site Alias ']
+
+
+# Function to open the workbook inside a downloaded RMS ZIP, or the workbook itself
+def open_workbook_zip(source):
+    """Return a ZipFile for the .xlsx package.
+
+    `source` may be a path or file object of an .xlsx, or of the ZIP the RMS export
+    is delivered in; in the latter case the first member is opened in place, without
+    extracting it to disk.
+    """
+    outer = zipfile.ZipFile(source)
+    names = outer.namelist()
+    if "[Content_Types].xml" in names:
+        return outer
+    return zipfile.ZipFile(outer.open(names[0]))
+
+
+def _first_sheet_path(workbook):
+    try:
+        with workbook.open("xl/workbook.xml") as f:
+            sheet = next(el for _, el in iterparse(f) if el.tag == f"{SHEET_NS}sheet")
+        rel_id = sheet.get(f"{REL_NS}id")
+        with workbook.open("xl/_rels/workbook.xml.rels") as f:
+            for _, el in iterparse(f):
+                if el.tag == f"{PKG_REL_NS}Relationship" and el.get("Id") == rel_id:
+                    target = el.get("Target")
+                    if target.startswith("/"):
+                        return target.lstrip("/")
+                    return posixpath.normpath(posixpath.join("xl", target))
+    except (KeyError, StopIteration):
+        pass
+    return "xl/worksheets/sheet1.xml"
+
+
+def _string_item_text(item):
+    # Rich text is split over several <r><t> runs; phonetic hints (<rPh>) are skipped
+    parts = []
+    for child in item:
+        if child.tag == f"{SHEET_NS}t":
+            parts.append(child.text or "")
+        elif child.tag == f"{SHEET_NS}r":
+            parts.append(child.findtext(f"{SHEET_NS}t") or "")
+    return "".join(parts)
+
+
+def _read_shared_strings(workbook):
+    if "xl/sharedStrings.xml" not in workbook.namelist():
+        return []
+    strings = []
+    with workbook.open("xl/sharedStrings.xml") as f:
+        for _, el in iterparse(f):
+            if el.tag == f"{SHEET_NS}si":
+                strings.append(_string_item_text(el))
+                el.clear()
+    return strings
+
+
+def _column_index(cell_ref):
+    index = 0
+    for ch in cell_ref:
+        if not ch.isalpha():
+            break
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index - 1
+
+
+def _cell_value(cell, shared_strings):
+    cell_type = cell.get("t")
+    if cell_type == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{SHEET_NS}t"))
+    value = cell.findtext(f"{SHEET_NS}v")
+    if value is None:
+        return None
+    if cell_type == "s":
+        return shared_strings[int(value)]
+    if cell_type in ("str", "e"):
+        return value
+    if cell_type == "b":
+        return value == "1"
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def _to_datetime(values):
+    """Parse a column of date cells; numbers are Excel serial dates, text goes through pandas"""
+    series = pd.Series(values, dtype=object)
+    is_serial = series.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    parsed = pd.to_datetime(series.where(~is_serial), errors='coerce')
+    if is_serial.any():
+        serials = pd.to_datetime(series[is_serial].astype(float), unit='D', origin='1899-12-30')
+        parsed[is_serial] = serials.dt.round('ms')
+    return parsed
+
+
+def _batch_frame(columns):
+    df = pd.DataFrame(columns)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = _to_datetime(df[col])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+# Function to stream an RMS report as typed DataFrame batches
+def iter_report_batches(source, usecols=None, batch_rows=BATCH_ROWS, header_row=HEADER_ROW):
+    """Yield DataFrames of up to `batch_rows` rows from the first sheet of the report.
+
+    Rows above `header_row` (the RMS banner) are skipped, only the `usecols` columns
+    are kept, date columns come out as datetime64 and zone/site as categoricals.
+    """
+    usecols = DEFAULT_COLUMNS if usecols is None else usecols
+    workbook = open_workbook_zip(source)
+    try:
+        shared_strings = _read_shared_strings(workbook)
+        wanted = None  # column index -> header name, known once the header row is read
+        columns = {}
+        row_count = 0
+        row_number = 0
+        batches_yielded = 0
+
+        with workbook.open(_first_sheet_path(workbook)) as f:
+            sheet_data = None
+            for event, el in iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if el.tag == f"{SHEET_NS}sheetData":
+                        sheet_data = el
+                    continue
+                if el.tag != f"{SHEET_NS}row":
+                    continue
+
+                row_number = int(el.get("r", row_number + 1))
+                if row_number >= header_row:
+                    values = {}
+                    position = -1
+                    for cell in el.iter(f"{SHEET_NS}c"):
+                        ref = cell.get("r")
+                        position = _column_index(ref) if ref else position + 1
+                        if wanted is None or position in wanted:
+                            values[position] = _cell_value(cell, shared_strings)
+
+                    if wanted is None:
+                        wanted = {i: name for i, name in values.items() if name in usecols}
+                        columns = {name: [] for name in wanted.values()}
+                    elif any(v is not None for v in values.values()):
+                        for i, name in wanted.items():
+                            columns[name].append(values.get(i))
+                        row_count += 1
+                        if row_count >= batch_rows:
+                            yield _batch_frame(columns)
+                            batches_yielded += 1
+                            columns = {name: [] for name in wanted.values()}
+                            row_count = 0
+
+                # Drop parsed rows so memory stays flat however long the sheet is
+                el.clear()
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+        # The last partial batch; an empty report still yields one (empty) frame with its columns
+        if wanted is not None and (row_count or not batches_yielded):
+            yield _batch_frame(columns)
+    finally:
+        workbook.close()